@@ -0,0 +1,67 @@
+"""Runs demo_3's counting loop as asyncio tasks instead of threads (see 'async_count_worker()' in counter_worker.py)."""
+import asyncio
+import functools
+
+from counter_worker import async_count_worker
+
+
+class AsyncWorkerPool(object):
+    """Runs several copies of 'async_count_worker()' as tasks on the running asyncio event loop and combines their
+    partial counts.
+
+    Compared to worker threads, starting a worker is just creating a task, and stopping one is just cancelling it.
+    Neither blocks: cancelling a task only asks it to stop, and it stops the next time it gets control, which is right
+    away because it's always waiting on its command queue. There's no 'join()' for the UI to sit through. All of the
+    workers run on the main thread, so they can publish straight to the app without any locking."""
+
+    def __init__(self, worker_count, publish, tick_interval=1.0):
+        """'publish' is called (on the event loop's thread) with the sum of all workers' counters, at most once per
+        pass through the event loop however many workers ticked."""
+        self._worker_count = worker_count
+        self._publish = publish
+        self._tick_interval = tick_interval
+
+        self._tasks = None  # This will hold one asyncio Task per worker
+        self._command_queues = None  # This will hold one asyncio Queue per worker
+        self._partial_counts = None  # This will hold each worker's latest counter
+        self._is_publish_pending = False  # This tracks whether a call to '_publish_total()' is already scheduled
+
+    def start(self):
+        """Starts the workers. This must be called while the event loop is running (from a Kivy callback, when the app
+        was started with 'async_run()')."""
+        loop = asyncio.get_running_loop()
+        self._command_queues = [asyncio.Queue() for _ in range(self._worker_count)]
+        self._partial_counts = [0] * self._worker_count
+        self._tasks = [
+            loop.create_task(async_count_worker(
+                self._command_queues[worker_index],
+                functools.partial(self._on_worker_count, worker_index),
+                self._tick_interval))
+            for worker_index in range(self._worker_count)]
+
+    def broadcast(self, command):
+        """Sends a Command to every worker."""
+        for worker_queue in self._command_queues:
+            worker_queue.put_nowait(command)
+
+    def stop(self):
+        """Cancels every worker and returns right away. The tasks finish on the event loop's next pass."""
+        for task in self._tasks:
+            task.cancel()
+
+    async def wait_stopped(self):
+        """Waits for every cancelled worker to finish. The app doesn't need this; the benchmark uses it to time how long
+        stopping takes."""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _on_worker_count(self, worker_index, counter):
+        '''Adding up a hundred partial counts after every worker's tick would be wasteful, so just note the new count
+        and, if we haven't already, ask the loop to publish the total once everyone who's due has ticked.'''
+        self._partial_counts[worker_index] = counter
+        if not self._is_publish_pending:
+            self._is_publish_pending = True
+            asyncio.get_running_loop().call_soon(self._publish_total)
+
+    def _publish_total(self):
+        self._is_publish_pending = False
+        self._publish(sum(self._partial_counts))
@@ -0,0 +1,66 @@
+from kivy.clock import Clock
+
+
+class BatchedUpdates(object):
+    """Collects property changes for lots of widgets and applies them all in one pass, once per frame.
+
+    Setting a Kivy property isn't just an assignment: it compares the new value to the old one, then calls everything
+    bound to that property. When the same property is set several times before the frame is drawn (a value that's
+    updated by more than one source, say), every one of those sets pays for that. Handing the changes to a
+    BatchedUpdates instead just records them. Just before the next frame, or when 'apply()' is called, it sets each
+    widget's final values in a single pass, skipping any that haven't actually changed, so each property is set at
+    most once.
+
+    That only pays off when values are overwritten or left unchanged. Recording a change costs more than making it, so
+    when every value changes exactly once per frame (like demo_2's stress-test grid), setting the properties directly
+    is faster. Batching doesn't save any layout work either: Kivy's layouts already wait for the next frame before
+    laying themselves out, however many of their children change."""
+
+    def __init__(self):
+        '''This maps each widget with pending changes to a dictionary of property names and their newest values.
+        Python dictionaries remember insertion order, so changes are applied in the order the widgets were first
+        touched.'''
+        self._pending = {}
+
+        '''Use a Clock trigger, like DigitCounter does, so that any number of changes within a frame cost one pass.'''
+        self._trigger_apply = Clock.create_trigger(self._apply, -1)
+
+        self.changes = 0  # This counts the property changes handed to 'set()'
+        self.superseded = 0  # This counts changes that were replaced by a newer value before they were applied
+        self.unchanged = 0  # This counts changes that were skipped because the property already had that value
+        self.passes = 0  # This counts the passes that applied changes
+
+    def set(self, widget, **properties):
+        """Records new values for some of 'widget''s properties, e.g. 'batch.set(label, text="42", opacity=0)'. The
+        widget doesn't change until the batch is applied."""
+        '''Only the first change since the last pass needs to fire the trigger; after that, it's already fired.'''
+        if not self._pending:
+            self._trigger_apply()
+        widget_changes = self._pending.get(widget)
+        if widget_changes is None:
+            widget_changes = self._pending[widget] = {}
+        for name, value in properties.items():
+            if name in widget_changes:
+                self.superseded += 1
+            widget_changes[name] = value
+        self.changes += len(properties)
+
+    def apply(self):
+        """Applies every pending change right away instead of waiting for the next frame."""
+        self._trigger_apply.cancel()
+        self._apply(0)
+
+    def _apply(self, delta_time):
+        if not self._pending:
+            return
+
+        '''Swap in a fresh dictionary before applying anything, so that changes made by the callbacks we trigger go into
+        the next batch instead of the one we're looping over.'''
+        pending, self._pending = self._pending, {}
+        for widget, widget_changes in pending.items():
+            for name, value in widget_changes.items():
+                if getattr(widget, name) == value:
+                    self.unchanged += 1
+                else:
+                    setattr(widget, name, value)
+        self.passes += 1
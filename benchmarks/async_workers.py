@@ -0,0 +1,127 @@
+"""Compares the memory use and stop latency of demo_3's worker threads with its asyncio workers.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.async_workers [--workers 1 10 100] [--seconds 2]
+
+For each worker count, it starts that many counting workers, lets them tick once a second for a couple of seconds, and
+then stops them, once with one thread per worker (like demo_3's default mode) and once with an AsyncWorkerPool on an
+asyncio event loop. Each run happens in a fresh Python process so that memory left over from one run can't skew the
+next. It reports:
+
+    rss_kb      how much the process's resident memory grew while the workers were running (Linux only)
+    stop_ms     how long the caller was blocked stopping the workers (for threads, sending each one a StopCommand and
+                joining it; for asyncio, cancelling the tasks)
+    stopped_ms  how long until every worker had actually finished
+
+The asyncio workers run on a plain asyncio event loop rather than on Kivy's, which only adds drawing to the same loop.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+'''Keep Kivy from treating our command line as its own.'''
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+from async_worker_pool import AsyncWorkerPool  # noqa: E402
+from command_queue import CommandQueue, StopCommand  # noqa: E402
+from counter_worker import count_worker  # noqa: E402
+
+MODES = ['thread', 'asyncio']
+
+
+def _rss_kb():
+    """Returns the process's current resident memory in kilobytes, or 'None' if we can't tell."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return None
+
+
+def run_threads(worker_count, seconds):
+    command_queues = [CommandQueue() for _ in range(worker_count)]
+    threads = [threading.Thread(target=count_worker, args=(command_queue, lambda counter: None))
+               for command_queue in command_queues]
+
+    rss_before = _rss_kb()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    rss_after = _rss_kb()
+
+    '''This is what demo_3's '_stop_thread()' does, once per worker.'''
+    start = time.perf_counter()
+    for command_queue, thread in zip(command_queues, threads):
+        command_queue.put(StopCommand())
+        thread.join()
+    stop_time = time.perf_counter() - start
+    return rss_before, rss_after, stop_time, stop_time
+
+
+async def _run_asyncio(worker_count, seconds):
+    pool = AsyncWorkerPool(worker_count, lambda counter: None)
+
+    rss_before = _rss_kb()
+    pool.start()
+    await asyncio.sleep(seconds)
+    rss_after = _rss_kb()
+
+    start = time.perf_counter()
+    pool.stop()
+    stop_time = time.perf_counter() - start
+    await pool.wait_stopped()
+    stopped_time = time.perf_counter() - start
+    return rss_before, rss_after, stop_time, stopped_time
+
+
+def run_asyncio(worker_count, seconds):
+    return asyncio.run(_run_asyncio(worker_count, seconds))
+
+
+def run_single(mode, worker_count, seconds):
+    """Runs one configuration in this process and returns its results."""
+    runner = run_threads if mode == 'thread' else run_asyncio
+    rss_before, rss_after, stop_time, stopped_time = runner(worker_count, seconds)
+    return {
+        'mode': mode,
+        'workers': worker_count,
+        'rss_kb': rss_after - rss_before if rss_before is not None else None,
+        'stop_ms': stop_time * 1000,
+        'stopped_ms': stopped_time * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare worker threads with asyncio workers.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 10, 100], help="worker counts to try")
+    parser.add_argument('--seconds', type=float, default=2, help="how long to let the workers run before stopping")
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        '''We're the child process: run the one configuration we were asked to and hand the results back on stdout.'''
+        json.dump(run_single(args.mode, args.workers[0], args.seconds), sys.stdout)
+        return
+
+    print("%8s %8s %10s %10s %12s" % ("mode", "workers", "rss_kb", "stop_ms", "stopped_ms"))
+    for worker_count in args.workers:
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.async_workers', '--mode', mode, '--workers', str(worker_count),
+                 '--seconds', str(args.seconds)],
+                check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+            result = json.loads(output)
+            rss = "%10d" % result['rss_kb'] if result['rss_kb'] is not None else "%10s" % "n/a"
+            print("%8s %8d %s %10.2f %12.2f" % (
+                mode, worker_count, rss, result['stop_ms'], result['stopped_ms']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Measures how long it takes to turn counters of different sizes into display text.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.counter_format
+
+For each counter size, it times the plain '"%s" % counter' conversion the demo used to do on the main thread, then
+each CounterFormatter display mode. Times are per conversion, in microseconds.
+"""
+import sys
+import time
+
+from counter_formatter import CounterFormatter
+
+DIGIT_COUNTS = [10, 100, 1000, 10000, 100000, 300000]
+MIN_REPEATS = 3  # Every conversion is timed at least this many times
+MIN_SECONDS = 0.2  # ...and repeated until at least this much time has passed
+
+
+def time_conversion(convert, value):
+    """Returns the average time 'convert()' takes, in microseconds. Each call gets a different value so that nothing
+    can be served from a cache."""
+    repeats = 0
+    start = time.perf_counter()
+    while repeats < MIN_REPEATS or time.perf_counter() - start < MIN_SECONDS:
+        convert(value + repeats)
+        repeats += 1
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    '''Let the plain conversion handle numbers longer than Python 3.11's default limit of 4,300 digits so that we
+    have something to compare against. The CounterFormatter doesn't need this.'''
+    if hasattr(sys, 'set_int_max_str_digits'):
+        sys.set_int_max_str_digits(0)
+
+    formatters = [(mode, CounterFormatter(mode)) for mode in CounterFormatter.MODES]
+    print("%8s %14s" % ("digits", "'%s' us") + "".join(" %14s" % ("%s us" % mode) for mode, _ in formatters))
+    for digit_count in DIGIT_COUNTS:
+        value = 10 ** (digit_count - 1)
+        row = "%8d %14.1f" % (digit_count, time_conversion(lambda v: "%s" % v, value))
+        for _, formatter in formatters:
+            row += " %14.1f" % time_conversion(formatter.format, value)
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
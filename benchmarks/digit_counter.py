@@ -0,0 +1,54 @@
+"""Compares the cost of updating a 150pt counter displayed with a Label versus a DigitCounter.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.digit_counter
+
+For each counter width, it sets the widget's text to a run of consecutive numbers and forces the widget to finish
+updating after each one (re-rendering the texture for a Label, repainting the changed glyph rectangles for a
+DigitCounter), then reports how many updates per second each widget managed. Kivy needs an OpenGL context to create
+textures, so this opens a window.
+"""
+import os
+import time
+
+'''Keep Kivy from treating our command line as its own.'''
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from kivy.core.window import Window  # noqa: E402,F401
+from kivy.uix.label import Label  # noqa: E402
+
+from digit_counter import DigitCounter, warm_glyphs  # noqa: E402
+
+FONT_SIZE = 150
+UPDATES = 500  # How many updates to time for each widget and counter width
+DIGIT_COUNTS = [1, 4, 8, 16, 32]
+
+
+def time_updates(widget, finish_update, start_value):
+    """Returns the number of updates per second achieved by setting 'widget.text' to UPDATES consecutive values and
+    calling 'finish_update()' after each one."""
+    start = time.perf_counter()
+    for value in range(start_value, start_value + UPDATES):
+        widget.text = "%s" % value
+        finish_update()
+    return UPDATES / (time.perf_counter() - start)
+
+
+def main():
+    label = Label(font_size=FONT_SIZE, size=(4000, 200))
+    digit_counter = DigitCounter(font_size=FONT_SIZE, size=(4000, 200))
+
+    '''Render the digits once up front, like the app would have by the time it had been running for a few seconds.'''
+    warm_glyphs(digit_counter.font_name, FONT_SIZE)
+
+    print("%8s %16s %16s %10s" % ("digits", "Label upd/s", "Digit upd/s", "speedup"))
+    for digit_count in DIGIT_COUNTS:
+        start_value = 10 ** (digit_count - 1)
+        label_rate = time_updates(label, label.texture_update, start_value)
+        digit_rate = time_updates(digit_counter, digit_counter._refresh, start_value)
+        print("%8d %16.0f %16.0f %9.1fx" % (digit_count, label_rate, digit_rate, digit_rate / label_rate))
+
+
+if __name__ == "__main__":
+    main()
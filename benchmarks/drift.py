@@ -0,0 +1,110 @@
+"""Measures how far periodic ticks drift from the wall clock over a long, simulated run.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.drift [--hours 24] [--interval 1.0] [--seed 1]
+
+Nothing actually waits: the benchmark runs a simulated clock forward from one tick to the next. Each wake-up is a few
+milliseconds late and each tick takes a millisecond to run, which is roughly what a busy UI thread sees, and once an
+hour the whole program stalls for a few seconds (think garbage collection or a slow disk). It compares the "relative"
+schedule that 'Clock.schedule_interval()' and sleep-after-work loops use (each tick one interval after the previous
+tick ran) with periodic.py's DeadlineSchedule under each catch-up policy. For each one it reports:
+
+    ticks       how many times the callback ran
+    periods     how many periods those ticks said they covered (what a counter like demo_2's would show)
+    drift_s     how far the periods fall behind the time that actually passed, in seconds
+    late_ms     how late the final tick ran compared to the deadline it was meant for
+"""
+import argparse
+import math
+import random
+
+import periodic
+
+MAX_WAKE_UP_DELAY = 0.004  # Every wake-up is late by up to this many seconds
+TICK_DURATION = 0.001  # Every tick takes this long to run
+STALL_EVERY = 3600.0  # Once every this many seconds...
+STALL_DURATION = 5.0  # ...the program stalls for this long
+
+
+class SimulatedRun(object):
+    """The simulated clock, wake-up delays, and stalls shared by every schedule we test. Every schedule is given the
+    same random seed, so they all see exactly the same delays."""
+
+    def __init__(self, seconds, seed):
+        self.now = 0.0
+        self._end = seconds
+        self._random = random.Random(seed)
+        self._next_stall = STALL_EVERY
+
+    def finished(self):
+        return self.now >= self._end
+
+    def sleep_until(self, wake_time):
+        """Moves the clock to 'wake_time', plus however late we wake up, plus any stall that's due."""
+        self.now = max(self.now, wake_time) + self._random.uniform(0, MAX_WAKE_UP_DELAY)
+        if self.now >= self._next_stall:
+            self.now += STALL_DURATION
+            self._next_stall += STALL_EVERY
+
+    def run_tick(self):
+        self.now += TICK_DURATION
+
+
+def run_relative(seconds, interval, seed):
+    """Schedules each tick one interval after the previous tick ran, like 'Clock.schedule_interval()'."""
+    run = SimulatedRun(seconds, seed)
+    ticks = 0
+    last_tick_time = 0.0
+    while True:
+        run.sleep_until(last_tick_time + interval)
+        if run.finished():
+            break
+        last_tick_time = run.now
+        ticks += 1
+        run.run_tick()
+
+    '''A relative schedule has no deadlines of its own, so measure lateness against the grid it was supposed to
+    follow.'''
+    return ticks, ticks, last_tick_time - ticks * interval, last_tick_time
+
+
+def run_deadline(seconds, interval, seed, catch_up):
+    """Schedules ticks with a DeadlineSchedule using the given catch-up policy."""
+    run = SimulatedRun(seconds, seed)
+    schedule = periodic.DeadlineSchedule(interval, catch_up, clock=lambda: run.now)
+    last_tick_time = 0.0
+    while True:
+        run.sleep_until(run.now + schedule.time_until_due())
+        if run.finished():
+            break
+        for _ in schedule.collect():
+            last_tick_time = run.now
+            run.run_tick()
+    return schedule.ticks, schedule.periods, last_tick_time - math.floor(last_tick_time / interval) * interval, \
+        last_tick_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how far periodic ticks drift over a long simulated run.")
+    parser.add_argument('--hours', type=float, default=24, help="simulated hours to run for")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between ticks")
+    parser.add_argument('--seed', type=int, default=1, help="seed for the simulated wake-up delays")
+    args = parser.parse_args()
+    seconds = args.hours * 3600
+
+    runs = [('relative', run_relative(seconds, args.interval, args.seed))]
+    for catch_up in periodic.CATCH_UP_POLICIES:
+        runs.append((catch_up, run_deadline(seconds, args.interval, args.seed, catch_up)))
+
+    print("%10s %10s %10s %12s %10s" % ("schedule", "ticks", "periods", "drift_s", "late_ms"))
+    for name, (ticks, periods, late, last_tick_time) in runs:
+        '''Count the periods that had fully passed when the last tick ran, and compare that to the periods the ticks
+        accounted for.'''
+        elapsed_periods = math.floor(last_tick_time / args.interval)
+        drift = (elapsed_periods - periods) * args.interval
+        print("%10s %10d %10d %12.3f %10.3f" % (name, ticks, periods, drift, late * 1000))
+
+
+if __name__ == "__main__":
+    main()
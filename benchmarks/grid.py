@@ -0,0 +1,127 @@
+"""Measures how demo_2's stress-test grid scales with the number of counters.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.grid [--sizes 10 20 40 60] [--seconds 10] [--fps 60] [--no-batch]
+
+For each size N, it runs demo_2 with an N x N grid of counters, with Labels and with DigitCounters, each once with the
+grid's changes set on the cells directly and once with them going through a BatchedUpdates ('--no-batch' skips the
+batched ones). It uses the same simulated clock as 'benchmarks.headless' (every counter changes once per simulated
+second), and reports frame time statistics and the time each grid update took (all of its rows added together), in
+milliseconds, with the direct and batched runs of each widget side by side. 'frames' is the most frames the frame
+scheduler spread one update's rows across. It also counts how many times the grid was laid out in the frames where
+the grid was updated: 'max' is the most layouts in any one of those frames, which should never be more than one.
+(Changing a cell's text or opacity doesn't change its size, so it's usually zero.)
+"""
+import argparse
+import collections
+import functools
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.headless import _summarize, run_demo
+
+WIDGETS = ['label', 'digit']
+MODES = ['direct', 'batched']
+
+
+def run_single(size, widget, mode, seconds, fps):
+    """Runs one grid configuration in this process and returns its results."""
+    from kivy.clock import Clock
+    from kivy.uix.gridlayout import GridLayout
+    import demo_2
+
+    '''Count layouts by wrapping GridLayout's 'do_layout()' before any grid is created. (A layout builds its layout
+    trigger from the method when it's created, so wrapping it afterwards would miss every call.) We note the Clock's
+    frame number on each call so we can tell how many layouts happened in the same frame. The Clock finds the method
+    again by name, so the wrapper has to keep the name 'do_layout'; that's what 'functools.wraps()' takes care of.'''
+    layout_frames = []
+    do_layout = GridLayout.do_layout
+
+    @functools.wraps(do_layout)
+    def counting_do_layout(self, *args):
+        layout_frames.append(Clock.frames)
+        return do_layout(self, *args)
+
+    GridLayout.do_layout = counting_do_layout
+
+    '''The grid update is handed to the frame scheduler one row at a time, so time each row, and note which update
+    (by the counter it shows) and which frame it ran in.'''
+    update_frames = set()
+    update_durations = collections.defaultdict(float)
+    frames_per_update = collections.defaultdict(set)
+    update_grid_row = demo_2.DemoApp._update_grid_row
+
+    @functools.wraps(update_grid_row)
+    def timed_update_grid_row(self, first_index, count, counter):
+        update_frames.add(Clock.frames)
+        frames_per_update[counter].add(Clock.frames)
+        start = time.perf_counter()
+        try:
+            return update_grid_row(self, first_index, count, counter)
+        finally:
+            update_durations[counter] += time.perf_counter() - start
+
+    demo_2.DemoApp._update_grid_row = timed_update_grid_row
+
+    result = run_demo('demo_2', seconds, fps, {'grid_size': (size, size), 'digit_counter': widget == 'digit',
+                                               'batch_updates': mode == 'batched'})
+    layouts_per_frame = collections.Counter(frame for frame in layout_frames if frame in update_frames)
+    result.update({
+        'cells': size * size,
+        'widget': widget,
+        'mode': mode,
+        'update_ms': _summarize(list(update_durations.values())),
+        'max_frames_per_update': max((len(frames) for frames in frames_per_update.values()), default=0),
+        'update_frames': len(update_frames),
+        'update_frame_layouts': sum(layouts_per_frame.values()),
+        'max_layouts_per_update_frame': max(layouts_per_frame.values()) if layouts_per_frame else 0,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how demo_2's stress-test grid scales.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 20, 40, 60], help="grid sizes (N for N x N)")
+    parser.add_argument('--seconds', type=float, default=10, help="simulated seconds to run each grid for")
+    parser.add_argument('--fps', type=int, default=60, help="simulated frames per second")
+    parser.add_argument('--no-batch', action='store_true', help="only run with the changes set directly")
+    parser.add_argument('--widget', choices=WIDGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    '''Set up Kivy's environment the same way 'benchmarks.headless' does.'''
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+
+    if args.widget:
+        '''We're the child process: run the one grid we were asked to and hand the results back on stdout.'''
+        json.dump(run_single(args.sizes[0], args.widget, args.mode, args.seconds, args.fps), sys.stdout)
+        return
+
+    modes = ['direct'] if args.no_batch else MODES
+    print("%6s %7s %7s %8s %9s %9s %9s %9s %9s %9s %7s %12s" % (
+        "N", "cells", "widget", "mode", "build_ms", "frame_p50", "frame_p99", "frame_max", "update_ms", "update_p99",
+        "frames", "layouts/max"))
+    for size in args.sizes:
+        for widget in WIDGETS:
+            for mode in modes:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.grid', '--sizes', str(size), '--widget', widget,
+                     '--mode', mode, '--seconds', str(args.seconds), '--fps', str(args.fps)],
+                    check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+                result = json.loads(output)
+                print("%6d %7d %7s %8s %9.1f %9.2f %9.2f %9.2f %9.2f %10.2f %7d %9d/%-2d" % (
+                    size, result['cells'], widget, mode, result['build_ms'], result['frame_ms']['p50'],
+                    result['frame_ms']['p99'], result['frame_ms']['max'], result['update_ms'].get('mean', 0.0),
+                    result['update_ms'].get('p99', 0.0), result['max_frames_per_update'],
+                    result['update_frame_layouts'], result['max_layouts_per_update_frame']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Runs the demo apps without a screen and reports how long they take to build, update, and draw.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.headless [--demos demo_1 demo_2 demo_3] [--seconds 60] [--fps 60] [--output results.json]
+
+Each demo runs in its own Python process so that one demo's memory use and leftover timers can't affect the next. If
+there's no display, SDL's "offscreen" video driver is used, which renders with Mesa's software OpenGL, so no GPU is
+needed either.
+
+Rather than letting Kivy's Clock follow the wall clock, the harness replaces the Clock's time source with a simulated
+one and advances it by exactly one frame (1/fps seconds) before each frame. Timers fire on the same frames every run,
+no matter how fast or slow the machine is. The harness never starts demo_3's worker thread (its timing depends upon
+the operating system's scheduler); instead, it publishes a new counter value once per simulated second, just like the
+worker would.
+
+The results are printed (or written to '--output') as JSON:
+
+    build_ms              how long the app's build() method took
+    update_ms             statistics for each call to the demo's periodic update method ('_update()' for demo_1 and
+                          demo_2, '_update_data()' for demo_3)
+    frame_ms              statistics for each frame (Clock callbacks, input, layout, and drawing)
+    peak_rss_kb           the process's peak resident memory
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+DEMOS = ['demo_1', 'demo_2', 'demo_3']
+
+
+def _summarize(durations):
+    """Turns a list of durations in seconds into statistics in milliseconds."""
+    if not durations:
+        return {'count': 0}
+    ordered = sorted(durations)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered) * 1000,
+        'p50': percentile(0.50),
+        'p90': percentile(0.90),
+        'p99': percentile(0.99),
+        'max': ordered[-1] * 1000,
+    }
+
+
+def _timed(function, durations):
+    """Wraps 'function' so that every call appends how long it took to 'durations'."""
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+def run_demo(demo_name, seconds, fps, app_kwargs=None):
+    """Runs one demo in this process and returns its results. 'app_kwargs' are passed to the demo's DemoApp
+    constructor."""
+
+    '''Everything Kivy-related is imported here, after the environment has been set up in main().'''
+    import importlib
+    from kivy.base import EventLoop
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+
+    demo = importlib.import_module(demo_name)
+    app = demo.DemoApp(**(app_kwargs or {}))
+
+    '''Wrap the method the demo calls periodically so we can time it. This has to happen before build() and on_start()
+    run, because that's when the demos hand the method over to the Clock (or to demo_3's channel). Setting an
+    attribute on the instance hides the class's method of the same name.'''
+    update_durations = []
+    update_method_name = '_update_data' if demo_name == 'demo_3' else '_update'
+    setattr(app, update_method_name, _timed(getattr(app, update_method_name), update_durations))
+
+    '''Take over the Clock's sense of time. The Clock calls 'time()' whenever it needs the current time; we hand it a
+    function that returns our simulated time instead. Setting the maximum frame rate to zero stops the Clock from
+    sleeping between frames.'''
+    simulated_time = [Clock.time()]
+    Clock.time = lambda: simulated_time[0]
+    Clock._max_fps = 0
+
+    '''This is what App.run() does before starting the main loop.'''
+    start = time.perf_counter()
+    app.root = app.build()
+    build_time = time.perf_counter() - start
+    Window.add_widget(app.root)
+    app.dispatch('on_start')
+    EventLoop.start()
+
+    frame_durations = []
+    frame_interval = 1.0 / fps
+    for frame in range(int(seconds * fps)):
+        simulated_time[0] += frame_interval
+
+        '''demo_3 normally gets its counter values from a worker thread. Publish one per simulated second instead.'''
+        if demo_name == 'demo_3' and frame % fps == 0:
+            app._publish_counter(frame // fps + 1)
+
+        start = time.perf_counter()
+        EventLoop.idle()
+        frame_durations.append(time.perf_counter() - start)
+
+    app.dispatch('on_stop')
+    EventLoop.close()
+
+    return {
+        'demo': demo_name,
+        'simulated_seconds': seconds,
+        'fps': fps,
+        'build_ms': build_time * 1000,
+        'update_ms': _summarize(update_durations),
+        'frame_ms': _summarize(frame_durations),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the demo apps without a screen.")
+    parser.add_argument('--demos', nargs='+', choices=DEMOS, default=DEMOS, help="which demos to run")
+    parser.add_argument('--seconds', type=float, default=60, help="simulated seconds to run each demo for")
+    parser.add_argument('--fps', type=int, default=60, help="simulated frames per second")
+    parser.add_argument('--output', help="write the JSON results to this file instead of printing them")
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    '''Set up Kivy's environment before anything imports it. Kivy reads these when it's first imported.'''
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+
+    if args.single:
+        '''We're the child process: run the one demo we were asked to and hand the results back on stdout.'''
+        json.dump(run_demo(args.demos[0], args.seconds, args.fps), sys.stdout)
+        return
+
+    results = []
+    for demo_name in args.demos:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.headless', '--single', '--demos', demo_name,
+             '--seconds', str(args.seconds), '--fps', str(args.fps)],
+            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        results.append(json.loads(output))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sdl_video_driver': os.environ.get('SDL_VIDEODRIVER', ''),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
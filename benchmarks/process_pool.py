@@ -0,0 +1,93 @@
+"""Measures how demo_3's counting throughput scales with the number of workers when every tick does CPU-bound work.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.process_pool
+
+For each worker count, it runs the counting loop flat out (no delay between ticks) for a few seconds, once with worker
+threads and once with a ProcessWorkerPool, and reports the total number of ticks per second. Threads share the GIL, so
+their throughput stays flat no matter how many you add. Processes should scale up to the number of CPU cores.
+"""
+import os
+import threading
+import time
+
+'''Keep Kivy from treating our command line as its own.'''
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from command_queue import CommandQueue, StopCommand  # noqa: E402
+from counter_worker import count_worker  # noqa: E402
+from process_worker_pool import ProcessWorkerPool  # noqa: E402
+
+DURATION = 3.0  # How long to run each configuration, in seconds
+WORK_PER_TICK = 20000  # How many iterations of simulate_work() each tick performs
+
+
+class _Total(object):
+    """Holds the most recent total counter value published by the workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def publish(self, value):
+        with self._lock:
+            self.value = value
+
+
+def run_threads(worker_count):
+    """Runs 'worker_count' worker threads for DURATION seconds and returns the total number of ticks."""
+    command_queues = [CommandQueue() for _ in range(worker_count)]
+    partial_counts = [0] * worker_count
+    threads = []
+    for worker_index in range(worker_count):
+
+        def publish(counter, worker_index=worker_index):
+            partial_counts[worker_index] = counter
+
+        threads.append(threading.Thread(
+            target=count_worker,
+            args=(command_queues[worker_index], publish, 0.0, WORK_PER_TICK)))
+
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    for command_queue in command_queues:
+        command_queue.put(StopCommand())
+    for thread in threads:
+        thread.join()
+    return sum(partial_counts)
+
+
+def run_processes(worker_count):
+    """Runs a ProcessWorkerPool with 'worker_count' workers for DURATION seconds and returns the total number of ticks.
+    The clock starts once the first counter arrives so that process start-up time isn't counted."""
+    total = _Total()
+    pool = ProcessWorkerPool(worker_count, total.publish, tick_interval=0.0, work_per_tick=WORK_PER_TICK)
+    pool.start()
+    while total.value == 0:
+        time.sleep(0.01)
+    start_count = total.value
+    time.sleep(DURATION)
+    end_count = total.value
+    pool.stop()
+    return end_count - start_count
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cpu_count} | {n for n in (8, 16) if n <= cpu_count})
+
+    print("CPU cores: %d, work per tick: %d iterations, %.1fs per run" % (cpu_count, WORK_PER_TICK, DURATION))
+    print("%8s %16s %16s %10s" % ("workers", "threads tick/s", "procs tick/s", "speedup"))
+    baseline = None
+    for worker_count in worker_counts:
+        thread_rate = run_threads(worker_count) / DURATION
+        process_rate = run_processes(worker_count) / DURATION
+        if baseline is None:
+            baseline = process_rate
+        print("%8d %16.1f %16.1f %9.2fx" % (worker_count, thread_rate, process_rate, process_rate / baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Replays a recorded session of one of the demos without a screen, as fast as it can, and checks that it ends up in
+the same state as the recording.
+
+Record a session by running a demo with the DEMO_RECORD_SESSION environment variable set to a file name (see
+session_log.py), then run this from the top of the repository with:
+
+    python -m benchmarks.replay session.log [--repeat 3] [--output results.json]
+
+Like 'benchmarks.headless', the replay takes over the Clock's sense of time, but instead of advancing it by a fixed
+amount per frame, it sets it to the time of each recorded tick, so every timer fires on the same frame it did while
+recording. Button presses are dispatched, and worker messages published to demo_3's counter channel, at the same
+points between ticks where they were recorded. No workers are started (the recorded messages stand in for them), so
+nothing depends on how the operating system schedules threads, and two replays of the same recording do exactly the
+same work. Each replay runs in its own Python process.
+
+The one difference from the recording is that a press is replayed after the tick it followed has finished drawing,
+where Kivy handles real input a little earlier in the frame. Anything the press changes in the widgets shows up one
+frame later, but it still happens before the next recorded tick.
+
+The results are printed (or written to '--output') as JSON, one entry per replay:
+
+    recorded_seconds      how long the recorded session lasted
+    replay_seconds        how long the replay took
+    speedup               how many times faster than real time the replay ran
+    frame_ms              statistics for each frame (Clock callbacks, input, layout, and drawing)
+    presses, messages     how many button presses and worker messages were replayed
+    state_matches         whether every widget's text, opacity, and disabled flag matched the recording at the end
+    mismatches            the widgets that didn't match, as [index, recorded, replayed]
+
+The exit status is 1 if any replay didn't match its recording.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.headless import _summarize
+
+'''Replays stop worker methods from doing anything by hiding them with this.'''
+_WORKER_METHODS = ['_start_workers', '_stop_workers', '_send_command']
+
+'''How many mismatched widgets to report.'''
+MAX_MISMATCHES = 10
+
+
+def _ignore(*args):
+    pass
+
+
+def run_replay(path):
+    """Replays the recording in 'path' in this process and returns its results."""
+
+    '''Everything Kivy-related is imported here, after the environment has been set up in main().'''
+    import importlib
+    from kivy.base import EventLoop
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+    import session_log
+
+    description, records = session_log.read_session(path)
+    demo = importlib.import_module(description['demo'])
+    app = demo.DemoApp(**description['app_kwargs'])
+
+    '''demo_3 starts, stops, and sends commands to its workers from these methods. The workers' output is in the
+    recording, so the replay shouldn't run any. The buttons' own changes to the widgets still happen as usual.'''
+    for name in _WORKER_METHODS:
+        if hasattr(app, name):
+            setattr(app, name, _ignore)
+
+    '''Take over the Clock's sense of time, the same way 'benchmarks.headless' does, and start it at the point the
+    recording started. The Clock's last tick gets the same head start it had then.'''
+    start_time = Clock.time()
+    simulated_time = [start_time]
+    Clock.time = lambda: simulated_time[0]
+    Clock._max_fps = 0
+
+    '''This is what App.run() does before starting the main loop.'''
+    app.root = app.build()
+    Window.add_widget(app.root)
+    buttons = session_log.find_buttons(app.root)
+    Clock._last_tick = start_time + description['last_tick_offset']
+    app.dispatch('on_start')
+    EventLoop.start()
+
+    frame_durations = []
+    recorded_seconds = 0.0
+    presses = messages = 0
+    recorded_state = None
+    replay_start = time.perf_counter()
+    for record_type, value in records:
+        if record_type == session_log.FRAME:
+            simulated_time[0] = start_time + value
+            recorded_seconds = value
+            start = time.perf_counter()
+            EventLoop.idle()
+            frame_durations.append(time.perf_counter() - start)
+        elif record_type == session_log.PRESS:
+            buttons[value].dispatch('on_press')
+            presses += 1
+        elif record_type == session_log.MESSAGE:
+            app._counter_channel.publish(value)
+            messages += 1
+        elif record_type == session_log.STATE:
+            recorded_state = value
+    replay_seconds = time.perf_counter() - replay_start
+
+    '''Compare the way the recording does, before the app's 'on_stop()'. JSON turns the recorded tuples into lists, so
+    round-trip ours the same way before comparing.'''
+    replayed_state = json.loads(json.dumps(session_log.widget_state(app.root)))
+    app.dispatch('on_stop')
+    EventLoop.close()
+
+    mismatches = []
+    if recorded_state is None:
+        mismatches.append([None, "no final state in the recording", None])
+    else:
+        for index in range(max(len(recorded_state), len(replayed_state))):
+            recorded = recorded_state[index] if index < len(recorded_state) else None
+            replayed = replayed_state[index] if index < len(replayed_state) else None
+            if recorded != replayed:
+                mismatches.append([index, recorded, replayed])
+
+    return {
+        'recording': path,
+        'demo': description['demo'],
+        'recorded_seconds': recorded_seconds,
+        'replay_seconds': replay_seconds,
+        'speedup': recorded_seconds / replay_seconds if replay_seconds > 0 else None,
+        'frame_ms': _summarize(frame_durations),
+        'presses': presses,
+        'messages': messages,
+        'state_matches': not mismatches,
+        'mismatches': mismatches[:MAX_MISMATCHES],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded demo session without a screen.")
+    parser.add_argument('recording', help="the file a demo recorded with DEMO_RECORD_SESSION")
+    parser.add_argument('--repeat', type=int, default=1, help="how many times to replay it")
+    parser.add_argument('--output', help="write the JSON results to this file instead of printing them")
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    '''Set up Kivy's environment the same way 'benchmarks.headless' does.'''
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+
+    if args.single:
+        '''We're the child process: run one replay and hand the results back on stdout.'''
+        json.dump(run_replay(args.recording), sys.stdout)
+        return
+
+    results = []
+    for _ in range(args.repeat):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.replay', '--single', args.recording],
+            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        results.append(json.loads(output))
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if not all(result['state_matches'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
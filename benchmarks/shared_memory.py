@@ -0,0 +1,171 @@
+"""Compares sending counter values from a worker process to the UI through a multiprocessing Queue versus a
+SharedCounterBlock.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.shared_memory
+
+A producer process publishes its current time (from the system-wide monotonic clock) as fast as it can, and then again
+at a steady 1,000 messages per second. Meanwhile, this process plays the part of the UI: once per 60 Hz frame, it
+reads the newest value the producer has sent. For each transport, the benchmark reports how many messages per second
+the producer managed, how long each frame spent reading, and how old the newest value was by the time the frame saw it.
+"""
+import multiprocessing
+import os
+import queue
+import statistics
+import time
+
+'''Keep Kivy from treating our command line as its own.'''
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from shared_counter import SharedCounterBlock  # noqa: E402
+
+DURATION = 3.0  # How long to run each configuration, in seconds
+FRAME_INTERVAL = 1.0 / 60  # How often the pretend UI reads the newest value, in seconds
+RATES = [None, 1000]  # Messages per second for the producer to send ('None' means as fast as it can)
+MAX_READS_PER_FRAME = 1000  # The most queued messages the pretend UI will read in one frame before giving up
+
+
+def _pace(next_time, interval):
+    """Sleeps until 'next_time' and returns the time the message after that is due."""
+    delay = next_time - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    return next_time + interval
+
+
+def _queue_producer(result_queue, stop_event, sent_count, interval):
+    count = 0
+    next_time = time.monotonic()
+    while not stop_event.is_set():
+        result_queue.put(time.monotonic_ns())
+        count += 1
+        if interval:
+            next_time = _pace(next_time, interval)
+
+    '''Tell the reader that nothing else is coming.'''
+    result_queue.put(None)
+    sent_count.value = count
+
+
+def _shared_memory_producer(name, lock, doorbell, stop_event, sent_count, interval):
+    block = SharedCounterBlock.attach(name, lock, doorbell)
+    count = 0
+    next_time = time.monotonic()
+    while not stop_event.is_set():
+        block.publish(time.monotonic_ns())
+        count += 1
+        if interval:
+            next_time = _pace(next_time, interval)
+    block.close()
+    sent_count.value = count
+
+
+def _read_queue(result_queue):
+    """Drains the queue and returns the newest value in it, or 'None' if it was empty. A producer running flat out can
+    refill the queue as fast as we empty it, so we stop after MAX_READS_PER_FRAME messages, like a real UI would have
+    to in order to get on with drawing the frame."""
+    latest = None
+    for _ in range(MAX_READS_PER_FRAME):
+        try:
+            value = result_queue.get_nowait()
+        except queue.Empty:
+            break
+        if value is not None:
+            latest = value
+    return latest
+
+
+def _run_frames(read_latest):
+    """Calls 'read_latest()' once per frame for DURATION seconds. Returns lists of the time each read took and of the
+    age of the newest value it returned, both in microseconds."""
+    read_costs = []
+    ages = []
+    next_frame = time.monotonic()
+    end = next_frame + DURATION
+    while next_frame < end:
+        next_frame = _pace(next_frame, FRAME_INTERVAL)
+        start = time.perf_counter()
+        latest = read_latest()
+        read_costs.append((time.perf_counter() - start) * 1e6)
+        if latest is not None:
+            ages.append((time.monotonic_ns() - latest) / 1e3)
+    return read_costs, ages
+
+
+def run_queue(context, interval):
+    result_queue = context.Queue()
+    stop_event = context.Event()
+    sent_count = context.Value('q', 0)
+    process = context.Process(target=_queue_producer, args=(result_queue, stop_event, sent_count, interval))
+    process.start()
+
+    '''Wait for the first message so that process start-up time isn't counted.'''
+    result_queue.get()
+    read_costs, ages = _run_frames(lambda: _read_queue(result_queue))
+    stop_event.set()
+
+    '''Drain everything up to the producer's final 'None' so that it can exit.'''
+    while result_queue.get() is not None:
+        pass
+    process.join()
+    return sent_count.value, read_costs, ages
+
+
+def run_shared_memory(context, interval):
+    block = SharedCounterBlock.create(context)
+    stop_event = context.Event()
+    sent_count = context.Value('q', 0)
+    process = context.Process(
+        target=_shared_memory_producer,
+        args=block.handles() + (stop_event, sent_count, interval))
+    process.start()
+
+    state = {'sequence': 0}
+
+    def read_latest():
+        result = block.read_if_changed(state['sequence'])
+        if result is None:
+            return None
+        state['sequence'], _, counter = result
+        return counter
+
+    '''Wait for the first message so that process start-up time isn't counted.'''
+    while read_latest() is None:
+        time.sleep(0.001)
+    read_costs, ages = _run_frames(read_latest)
+    stop_event.set()
+    process.join()
+    block.close()
+    block.unlink()
+    return sent_count.value, read_costs, ages
+
+
+def _percentile(values, fraction):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    context = multiprocessing.get_context('spawn')
+    print("%-14s %10s %12s %14s %14s %14s %14s" % (
+        "transport", "rate", "msgs/s", "read p50 us", "read p99 us", "age p50 us", "age p99 us"))
+    for interval_rate in RATES:
+        interval = 1.0 / interval_rate if interval_rate else 0
+        for name, run in (("queue", run_queue), ("shared memory", run_shared_memory)):
+            sent, read_costs, ages = run(context, interval)
+            print("%-14s %10s %12.0f %14.1f %14.1f %14.1f %14.1f" % (
+                name,
+                interval_rate or "max",
+                sent / DURATION,
+                statistics.median(read_costs),
+                _percentile(read_costs, 0.99),
+                statistics.median(ages) if ages else float('nan'),
+                _percentile(ages, 0.99)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Measures how long each demo takes to get its first frame on the screen, with and without fast-start mode, and where
+the time goes.
+
+Run this from the top of the repository with:
+
+    python -m benchmarks.startup [--demos demo_1 demo_2 demo_3] [--runs 5] [--digit-counter]
+
+Each run starts the demo in a fresh Python process (a cold start, apart from whatever the operating system has cached),
+lets it run until startup.py says start-up is over, and closes it. If there's no display, SDL's "offscreen" video
+driver is used, as in 'benchmarks.headless'. For each demo and mode, it prints the median time of every phase that
+startup.py reports (see there for what each one covers) across the runs, plus:
+
+    python start         from launching the process until the demo began importing (the interpreter starting up)
+    first frame at       from launching the process until the first frame had been drawn
+    complete at          from launching the process until start-up was over (the same as 'first frame at' when fast
+                         start is off)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEMOS = ['demo_1', 'demo_2', 'demo_3']
+MODES = ['normal', 'fast']
+
+
+def run_single(demo_name, launch_time, digit_counter):
+    """Starts one demo in this process, and returns its phases once start-up is over."""
+    python_start = time.time() - launch_time
+
+    '''Import startup.py first, the way the demos do, so its timer starts before anything else is imported.'''
+    import importlib
+    import startup
+    demo = importlib.import_module(demo_name)
+    from kivy.clock import Clock
+    startup.mark('imports')
+
+    app = demo.DemoApp(**({'digit_counter': True} if digit_counter and demo_name != 'demo_1' else {}))
+    startup.track(app)
+
+    def stop_when_started(delta_time):
+        if startup.is_complete():
+            app.stop()
+            return False
+
+    Clock.schedule_interval(stop_when_started, 0)
+    app.run()
+
+    phases = [['python start', python_start]] + [list(phase) for phase in startup.phases()]
+    return {'phases': phases}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the demos' start-up time.")
+    parser.add_argument('--demos', nargs='+', choices=DEMOS, default=DEMOS, help="which demos to start")
+    parser.add_argument('--runs', type=int, default=5, help="how many times to start each demo in each mode")
+    parser.add_argument('--digit-counter', action='store_true', help="display the counters with DigitCounters")
+    parser.add_argument('--launch-time', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    '''Set up Kivy's environment the same way 'benchmarks.headless' does.'''
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+
+    if args.launch_time is not None:
+        '''We're the child process: start the one demo we were asked to and hand the results back on stdout.'''
+        json.dump(run_single(args.demos[0], args.launch_time, args.digit_counter), sys.stdout)
+        return
+
+    for demo_name in args.demos:
+        for mode in MODES:
+            environment = dict(os.environ, DEMO_FAST_START='1' if mode == 'fast' else '0')
+            runs = []
+            for _ in range(args.runs):
+                command = [sys.executable, '-m', 'benchmarks.startup', '--demos', demo_name,
+                           '--launch-time', repr(time.time())]
+                if args.digit_counter:
+                    command.append('--digit-counter')
+                output = subprocess.run(command, env=environment, check=True, stdout=subprocess.PIPE,
+                                        universal_newlines=True).stdout
+                runs.append(json.loads(output)['phases'])
+
+            '''Every run of a demo in one mode goes through the same phases, so we can line them up.'''
+            print("%s, %s start (median of %d runs):" % (demo_name, mode, len(runs)))
+            total = 0.0
+            first_frame_at = None
+            for index, (phase, _) in enumerate(runs[0]):
+                duration = statistics.median(run[index][1] for run in runs)
+                total += duration
+                print("    %-18s %8.1f ms" % (phase, duration * 1000))
+                if phase == 'first frame':
+                    first_frame_at = total
+            print("    %-18s %8.1f ms" % ("first frame at", first_frame_at * 1000))
+            print("    %-18s %8.1f ms" % ("complete at", total * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Optional profiling for the callbacks the demos hand to Kivy.
+
+Set the DEMO_PROFILE_CALLBACKS environment variable to 1 to turn profiling on. For each callback, the profiler then
+records how many times it was called, a histogram of how long each call took, and, for Clock callbacks and the
+changes a FrameScheduler runs, a histogram of how late each call was compared to when it was scheduled (or submitted)
+to run. Call 'dump()' to log the results, or to write them as JSON to the file named by the DEMO_PROFILE_OUTPUT
+environment variable. The demos call it from 'on_stop()'.
+
+The demos register callbacks through this module's 'schedule_interval()', 'schedule_once()', and 'profiled()' instead
+of going to the Clock directly. When profiling is off, 'schedule_interval()' and 'schedule_once()' simply *are* the
+Clock's own methods, and 'profiled()' hands back the callback it was given, so the callbacks run exactly as they would
+without the profiler.
+"""
+import json
+import os
+import time
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+ENABLED = os.environ.get('DEMO_PROFILE_CALLBACKS', '0') == '1'
+
+'''Histogram bucket 'i' counts calls that took between 2**(i-1) and 2**i microseconds (bucket 0 counts anything under a
+microsecond), and the last bucket also counts everything slower than that.'''
+HISTOGRAM_BUCKETS = 24
+
+
+def _bucket(seconds):
+    microseconds = int(seconds * 1e6)
+    return min(HISTOGRAM_BUCKETS - 1, microseconds.bit_length())
+
+
+class CallbackStats(object):
+    """The numbers the profiler collects for one callback."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.duration_histogram = [0] * HISTOGRAM_BUCKETS
+        self.lagged_calls = 0  # This counts the calls we know a scheduled time for
+        self.max_lag = 0.0
+        self.lag_histogram = [0] * HISTOGRAM_BUCKETS
+
+    def record(self, duration, lag=None):
+        self.calls += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.duration_histogram[_bucket(duration)] += 1
+        if lag is not None:
+            '''A callback can run a hair early, depending upon how the Clock rounds its times. Count that as on time.'''
+            lag = max(0.0, lag)
+            self.lagged_calls += 1
+            self.max_lag = max(self.max_lag, lag)
+            self.lag_histogram[_bucket(lag)] += 1
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'mean_duration_ms': self.total_duration / self.calls * 1000 if self.calls else 0.0,
+            'max_duration_ms': self.max_duration * 1000,
+            'duration_histogram_us': self.duration_histogram,
+            'max_lag_ms': self.max_lag * 1000,
+            'lag_histogram_us': self.lag_histogram if self.lagged_calls else None,
+        }
+
+
+'''This maps each callback name to its CallbackStats.'''
+_stats = {}
+
+
+def _stats_for(name, callback):
+    if name is None:
+        name = getattr(callback, '__qualname__', None) or repr(callback)
+    if name not in _stats:
+        _stats[name] = CallbackStats(name)
+    return _stats[name]
+
+
+def _profiled(callback, name=None, due=None):
+    stats = _stats_for(name, callback)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            stats.record(time.perf_counter() - start, None if due is None else start - due)
+
+    return wrapper
+
+
+def _profiled_schedule_once(callback, timeout=0, name=None):
+    stats = _stats_for(name, callback)
+    due = time.perf_counter() + max(0, timeout)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            stats.record(time.perf_counter() - start, start - due)
+
+    return Clock.schedule_once(wrapper, timeout)
+
+
+def _profiled_schedule_interval(callback, timeout, name=None):
+    stats = _stats_for(name, callback)
+
+    '''Kivy schedules each call of an interval callback 'timeout' seconds after the previous call actually ran, so
+    that's when we expect it.'''
+    state = {'due': time.perf_counter() + timeout}
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            stats.record(time.perf_counter() - start, start - state['due'])
+            state['due'] = start + timeout
+
+    return Clock.schedule_interval(wrapper, timeout)
+
+
+def _unprofiled(callback, name=None, due=None):
+    return callback
+
+
+def _unprofiled_schedule_once(callback, timeout=0, name=None):
+    return Clock.schedule_once(callback, timeout)
+
+
+def _unprofiled_schedule_interval(callback, timeout, name=None):
+    return Clock.schedule_interval(callback, timeout)
+
+
+'''Pick the real functions once, when the module is imported. Each takes an optional 'name' to file the callback's
+numbers under; by default, the callback's own name is used. 'profiled()' also takes an optional 'due', the
+'time.perf_counter()' time the callback was meant to run at, for callbacks that something other than the Clock
+schedules (like a FrameScheduler), so that their lag gets recorded too. Like the Clock's methods, the scheduling
+functions return a ClockEvent; call its 'cancel()' method to unschedule the callback.'''
+if ENABLED:
+    profiled = _profiled
+    schedule_once = _profiled_schedule_once
+    schedule_interval = _profiled_schedule_interval
+else:
+    profiled = _unprofiled
+    schedule_once = _unprofiled_schedule_once
+    schedule_interval = _unprofiled_schedule_interval
+
+
+def report():
+    """Returns the numbers collected so far as a list of dictionaries, one per callback, busiest first."""
+    return [stats.as_dict() for stats in sorted(_stats.values(), key=lambda stats: -stats.total_duration)]
+
+
+def dump():
+    """Writes the numbers collected so far to the file named by the DEMO_PROFILE_OUTPUT environment variable, or logs
+    them if it isn't set. Does nothing if profiling is off."""
+    if not ENABLED:
+        return
+    output_path = os.environ.get('DEMO_PROFILE_OUTPUT')
+    if output_path:
+        with open(output_path, 'w') as output_file:
+            json.dump(report(), output_file, indent=2)
+        return
+    for entry in report():
+        Logger.info("Profiler: %s calls=%d mean=%.3fms max=%.3fms max_lag=%.3fms" % (
+            entry['name'], entry['calls'], entry['mean_duration_ms'], entry['max_duration_ms'], entry['max_lag_ms']))
@@ -0,0 +1,182 @@
+"""Typed commands for demo_3's counting workers, and a bounded queue to carry them.
+
+demo_3 used to send its workers plain tuples like "('10x', 0)" through an unbounded Queue, and the worker compared
+strings to figure out what each one meant. Here each kind of command is its own class, so a typo is an error instead of
+a message that's silently ignored, and the worker looks up what to do with a command by its class.
+
+CommandQueue holds at most 'max_depth' commands. If something keeps sending commands faster than the worker handles
+them (say, someone hammering the 10x button), the queue can't grow without limit; instead, its overflow policy decides
+what happens to a command that arrives when it's full:
+
+    BLOCK waits until the worker makes room.
+    DROP_OLDEST throws away the oldest command that's safe to lose (never a StopCommand) to make room.
+    MERGE folds the command into the newest queued one if they can be combined (two 10x presses become one 100x).
+
+If DROP_OLDEST or MERGE can't make room, the command waits, just like BLOCK.
+"""
+import collections
+import queue
+import threading
+
+
+class Command(object):
+    """The base class for commands sent to a worker. Each command carries one integer 'argument' so that it can travel
+    through a fixed-size slot in shared memory as well as through a queue."""
+
+    __slots__ = ()
+
+    '''Whether DROP_OLDEST may throw this command away.'''
+    droppable = True
+
+    @property
+    def argument(self):
+        return 0
+
+    @classmethod
+    def from_argument(cls, argument):
+        """Rebuilds a command from its 'argument'."""
+        return cls()
+
+    def merge(self, newer):
+        """Returns a single command with the same effect as this command followed by 'newer', or 'None' if the two
+        can't be combined."""
+        return None
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.argument == other.argument
+
+    def __hash__(self):
+        return hash((type(self), self.argument))
+
+    def __repr__(self):
+        return "%s(%d)" % (type(self).__name__, self.argument)
+
+
+class StopCommand(Command):
+    """Tells the worker to exit."""
+
+    __slots__ = ()
+    droppable = False
+
+    def __repr__(self):
+        return "StopCommand()"
+
+
+class MultiplyCommand(Command):
+    """Tells the worker to multiply its counter increment by 'factor'."""
+
+    __slots__ = ('factor',)
+
+    def __init__(self, factor=10):
+        self.factor = factor
+
+    @property
+    def argument(self):
+        return self.factor
+
+    @classmethod
+    def from_argument(cls, argument):
+        return cls(argument)
+
+    def merge(self, newer):
+        if isinstance(newer, MultiplyCommand):
+            return MultiplyCommand(self.factor * newer.factor)
+        return None
+
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+MERGE = 'merge'
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, MERGE)
+
+
+class CommandQueue(object):
+    """A bounded, thread-safe first-in, first-out queue of Commands. Like Python's Queue, 'put()' and 'get()' take an
+    optional timeout and raise 'queue.Full' and 'queue.Empty' when it runs out, so it can stand in for one. The worker
+    should use 'get_batch()' instead, which takes every waiting command at once."""
+
+    def __init__(self, max_depth=16, overflow=MERGE):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy '%s' (expected one of: %s)" % (
+                overflow, ", ".join(OVERFLOW_POLICIES)))
+        self._max_depth = max(1, max_depth)
+        self._overflow = overflow
+        self._commands = collections.deque()
+
+        '''Both conditions share one lock, so a producer and the worker never touch the deque at the same time.'''
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        self.put_count = 0  # This counts the commands handed to put()
+        self.merged_count = 0  # This counts commands that MERGE folded into a queued one
+        self.dropped_count = 0  # This counts queued commands that DROP_OLDEST threw away
+        self.blocked_count = 0  # This counts calls to put() that had to wait for room
+        self.max_depth_seen = 0  # This tracks the most commands that were ever waiting at once
+
+    @property
+    def depth(self):
+        """The number of commands waiting to be handled."""
+        with self._lock:
+            return len(self._commands)
+
+    def put(self, command, timeout=None):
+        """Adds a command to the queue, applying the overflow policy if the queue is full."""
+        with self._not_full:
+            self.put_count += 1
+            if len(self._commands) >= self._max_depth:
+                if self._overflow == MERGE:
+                    merged = self._commands[-1].merge(command)
+                    if merged is not None:
+                        self._commands[-1] = merged
+                        self.merged_count += 1
+                        return
+                elif self._overflow == DROP_OLDEST:
+                    for index, queued in enumerate(self._commands):
+                        if queued.droppable:
+                            del self._commands[index]
+                            self.dropped_count += 1
+                            break
+
+            if len(self._commands) >= self._max_depth:
+                self.blocked_count += 1
+                if not self._not_full.wait_for(lambda: len(self._commands) < self._max_depth, timeout):
+                    raise queue.Full
+
+            self._commands.append(command)
+            self.max_depth_seen = max(self.max_depth_seen, len(self._commands))
+            self._not_empty.notify()
+
+    def get_batch(self, timeout=None, max_batch=None):
+        """Waits up to 'timeout' seconds (forever if it's 'None') for at least one command, then removes and returns
+        every waiting command, up to 'max_batch' of them, oldest first. Raises 'queue.Empty' if nothing arrives in
+        time. Taking the whole batch under one lock means a flood of commands costs the worker one wake-up, not one
+        per command."""
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._commands, timeout):
+                raise queue.Empty
+            count = len(self._commands) if max_batch is None else min(max_batch, len(self._commands))
+            batch = [self._commands.popleft() for _ in range(count)]
+            self._not_full.notify_all()
+            return batch
+
+    def get(self, timeout=None):
+        """Removes and returns the oldest command, waiting up to 'timeout' seconds for one to arrive."""
+        return self.get_batch(timeout, max_batch=1)[0]
+
+
+class QueueBatchReader(object):
+    """Gives any Queue-like object with a 'get(timeout=...)' method (like a multiprocessing Queue) the same
+    'get_batch()' method as CommandQueue, so the worker can read from either one."""
+
+    def __init__(self, source):
+        self._source = source
+
+    def get_batch(self, timeout=None, max_batch=None):
+        batch = [self._source.get(timeout=timeout)]
+        while max_batch is None or len(batch) < max_batch:
+            try:
+                batch.append(self._source.get(timeout=0))
+            except queue.Empty:
+                break
+        return batch
@@ -0,0 +1,151 @@
+"""Turns demo_3's counter into display text, even once it has grown to thousands of digits."""
+import concurrent.futures
+import functools
+import math
+import threading
+
+
+'''Python's built-in int-to-string conversion takes time proportional to the square of the number of digits, and, since
+Python 3.11, refuses outright to convert numbers with more than about 4,300 digits. Below this many bits (roughly 2,400
+digits), we let 'str()' do the conversion directly; above it, '_int_to_decimal_string()' splits the number in half
+first.'''
+_DIRECT_CONVERSION_BITS = 8000
+
+
+@functools.lru_cache(maxsize=None)
+def _power_of_ten(exponent):
+    """Returns 10 ** exponent, remembering the result because building big powers of ten isn't cheap either."""
+    return 10 ** exponent
+
+
+def _int_to_decimal_string(value):
+    """Converts a non-negative integer of any size to its exact decimal string by splitting it into a high half and a
+    low half, converting each half, and gluing them back together."""
+    if value.bit_length() <= _DIRECT_CONVERSION_BITS:
+        return str(value)
+    low_digit_count = int(value.bit_length() * math.log10(2)) // 2
+    high, low = divmod(value, _power_of_ten(low_digit_count))
+    return _int_to_decimal_string(high) + _int_to_decimal_string(low).zfill(low_digit_count)
+
+
+class CounterFormatter(object):
+    """Turns counter values into the text the counter label displays.
+
+    Every press of the 10x button makes the counter grow ten times faster, so it doesn't take long before the counter
+    has more digits than fit on the screen and converting it to text starts to take real time. The formatter offers
+    three ways to display it:
+
+        FULL shows every digit, exactly.
+        SCIENTIFIC shows the leading 'digits' significant digits and a power of ten, like "1.23457e+42".
+        LAST_DIGITS shows only the last 'digits' digits, like "...456789".
+
+    Numbers shorter than 'digits' digits are always shown in full. Neither of the shortened modes converts the whole
+    number to decimal. The app never calls the formatter on the main thread (workers that deliver their values there
+    hand them to a BackgroundFormatter instead), so even the FULL conversion doesn't hold up the UI. The formatter also
+    remembers the last value it formatted in case it's asked for the same one again."""
+
+    FULL = 'full'
+    SCIENTIFIC = 'scientific'
+    LAST_DIGITS = 'last_digits'
+    MODES = (FULL, SCIENTIFIC, LAST_DIGITS)
+
+    def __init__(self, mode=FULL, digits=6):
+        if mode not in self.MODES:
+            raise ValueError("Unknown counter display mode '%s' (expected one of: %s)" % (mode, ", ".join(self.MODES)))
+        self._mode = mode
+        self._digits = digits
+        self._limit = 10 ** digits  # Counters below this are always shown in full
+
+        self._last_value = None  # This will hold the last counter value we formatted
+        self._last_text = None  # This will hold the text we formatted it as
+
+    def format(self, value):
+        """Returns the display text for 'value'."""
+        if value == self._last_value:
+            return self._last_text
+
+        if value < self._limit:
+            text = str(value)
+        elif self._mode == self.FULL:
+            text = _int_to_decimal_string(value)
+        elif self._mode == self.LAST_DIGITS:
+            '''Dividing a big number by a small one only takes time proportional to its length.'''
+            text = "..." + str(value % self._limit).zfill(self._digits)
+        else:
+            text = self._format_scientific(value)
+
+        self._last_value = value
+        self._last_text = text
+        return text
+
+    def _format_scientific(self, value):
+        """Works out the leading digits and the power of ten from the logarithm of 'value', using only its top 64
+        bits. That's plenty of precision for a handful of significant digits, and it never converts the whole number to
+        decimal."""
+        shift = max(0, value.bit_length() - 64)
+        logarithm = math.log10(value >> shift) + shift * math.log10(2)
+        exponent = int(math.floor(logarithm))
+        mantissa = "%.*f" % (self._digits - 1, 10 ** (logarithm - exponent))
+
+        '''Rounding can turn a mantissa like 9.999999 into "10.00000". If that happens, shift it down one place.'''
+        if mantissa.startswith("10"):
+            exponent += 1
+            mantissa = "%.*f" % (self._digits - 1, 1.0)
+        return "%se+%d" % (mantissa, exponent)
+
+
+class BackgroundFormatter(object):
+    """Formats counter values on a thread of its own and hands the text to 'publish()'.
+
+    demo_3's worker thread formats each value itself before publishing it, but its asyncio workers and its shared
+    memory reader deliver their values on the main thread, where a long conversion would hold up the UI. They hand their
+    values to a BackgroundFormatter instead. Like demo_3's LatestValueChannel, it only cares about the newest value:
+    values that arrive while the thread is busy replace each other, and only the last one is formatted when the thread
+    gets to it."""
+
+    def __init__(self, formatter, publish):
+        """'formatter' is the CounterFormatter to use, and 'publish' is called (on the formatting thread) with each
+        value's text."""
+        self._formatter = formatter
+        self._publish = publish
+
+        '''The lock protects the fields below, which are written by whoever submits values and read by the formatting
+        thread.'''
+        self._lock = threading.Lock()
+        self._value = None  # This will hold the most recently submitted value
+        self._is_pending = False  # This will track whether the formatting thread already has a call to make
+        self._executor = None  # This will hold the single-thread executor, once the first value arrives
+
+        self.submitted_count = 0  # This counts every value handed to submit()
+        self.formatted_count = 0  # This counts the values that actually got formatted
+
+    def submit(self, value):
+        """Asks for 'value' to be formatted and published. A string (like "Overflow") is published as it is, in order
+        with the values around it. This never waits for the formatting to finish."""
+        with self._lock:
+            self._value = value
+            self.submitted_count += 1
+            if self._is_pending:
+                return
+            self._is_pending = True
+
+            '''A ThreadPoolExecutor with a single worker runs its calls one at a time, in order, so the newest value is
+            always the last one published.'''
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='BackgroundFormatter')
+            self._executor.submit(self._format_latest)
+
+    def shutdown(self):
+        """Waits for any value that's being formatted to be published, and stops the formatting thread."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _format_latest(self):
+        with self._lock:
+            value = self._value
+            self._is_pending = False
+            self.formatted_count += 1
+        self._publish(value if isinstance(value, str) else self._formatter.format(value))
@@ -0,0 +1,153 @@
+"""The counting loop that demo_3's workers run, as a plain function for worker threads and processes and as an asyncio
+coroutine for async mode.
+
+Nothing here touches the UI or imports Kivy's App, so worker processes can import this module (and the worker pools
+built on it) without pulling in the app. Each loop increments a counter on a fixed grid of deadlines (see periodic.py),
+hands every new value to a 'publish()' function it's given, and handles the Commands from command_queue.py that the
+app sends it, until it receives a StopCommand.
+"""
+import asyncio
+import queue
+
+from command_queue import MultiplyCommand, StopCommand
+import periodic
+
+
+def simulate_work(iterations):
+    """Burns CPU time by running a pointless calculation 'iterations' times. This stands in for the sort of processing
+    a real worker might do on every tick (e.g., filtering a sensor reading) so that we can see how CPU-bound work
+    scales across threads and processes. The demo itself doesn't do any work, so it passes zero here."""
+    total = 0
+    for i in range(iterations):
+        total += i * i
+    return total
+
+
+class _CountState(object):
+    """The counting loop's variables, gathered into one object so that the command handlers below can change them."""
+
+    def __init__(self):
+        self.counter = 0  # This is the counter itself
+        self.counter_increment = 1  # This tracks how much to add to the counter on each tick
+        self.is_running = True  # This goes False when the worker should exit
+
+
+def _handle_stop(state, command):
+    """If the UI sent us a StopCommand, stop the loop. Returning from the worker method terminates the thread or process
+    task."""
+    state.is_running = False
+
+
+def _handle_multiply(state, command):
+    """If the UI sent us a MultiplyCommand, multiply the counter increment by its factor (10 per press of the 10x
+    button, or more if several presses were merged together). This will cause the counter to count in larger
+    increments. Not that there's any point to this--it's just an easy-to-observe effect for this demo."""
+    state.counter_increment *= command.factor
+
+
+'''This dispatch table maps each kind of command to the function that handles it. Looking the handler up by the
+command's class replaces a chain of 'if command == ...' string comparisons, and adding a new command just means adding
+a class in command_queue.py and a line here. A command with no entry here raises a KeyError instead of being silently
+ignored.'''
+_COMMAND_HANDLERS = {
+    StopCommand: _handle_stop,
+    MultiplyCommand: _handle_multiply,
+}
+
+
+def _run_due_ticks(state, schedule, publish, work_per_tick=0):
+    """Runs whatever ticks are due. Normally that's nothing or exactly one tick covering one period, but if the worker
+    fell behind, the catch-up policy decides whether it gets one tick per missed period or a single tick that covers
+    them all."""
+    for periods in schedule.collect():
+        '''Do this tick's (simulated) work and increment the counter.'''
+        simulate_work(work_per_tick)
+        state.counter += state.counter_increment * periods
+
+        '''Publish the new counter value.'''
+        publish(state.counter)
+
+
+def count_worker(command_queue, publish, tick_interval=1.0, work_per_tick=0, catch_up=periodic.COALESCE):
+    """This is the counting loop that runs inside each worker thread or worker process. It increments a counter every
+    'tick_interval' seconds and hands each new value to 'publish()' until it receives a StopCommand on 'command_queue'
+    (anything with a 'get_batch()' method, like a CommandQueue). It's safe to make blocking calls or do long-running
+    computations here because it doesn't run on the main UI thread. 'catch_up' says what to do about ticks that were
+    missed because the worker fell behind (see periodic.py); by default, the next tick makes up for all of them at once
+    so that the counter keeps pace with the wall clock."""
+    state = _CountState()
+
+    '''Track when the counter should next be incremented. The schedule keeps every tick on a fixed grid of deadlines
+    measured with 'time.monotonic()', which never jumps backwards (or forwards) if the system clock is adjusted.
+    Because the deadlines don't depend upon when each tick actually ran, the time it takes to process a tick (or to
+    wake up late) doesn't slowly push later ticks back.'''
+    schedule = periodic.DeadlineSchedule(tick_interval, catch_up)
+
+    '''Loop until a StopCommand arrives.'''
+    while state.is_running:
+
+        '''Wait for commands from the UI thread, but only until the next tick is due. This is a blocking call that
+        would normally freeze the UI if it were called on the main thread. If you're polling a GPIO or doing
+        something fast periodically, you could just use Kivy's timers and avoid the complexity of threads. However,
+        if you need to do something like issue a device read that will take some time to return, threads are a
+        useful way to avoid freezing the UI. By blocking on the message queue instead of calling 'time.sleep()', the
+        worker wakes up as soon as a command arrives, so a StopCommand or MultiplyCommand is handled right away instead
+        of waiting for the rest of the sleep to finish. If no command arrives before the timeout, 'get_batch()' raises
+        a 'queue.Empty' exception, which tells us that it's time to tick.'''
+        try:
+            '''Take every command that's waiting, not just the first one. If the UI sent a burst of commands, we
+            handle them all for the price of a single wake-up.'''
+            commands = command_queue.get_batch(timeout=schedule.time_until_due())
+        except queue.Empty:
+            commands = []
+
+        '''Run the ticks that are due before handling any commands, whether or not the wait timed out. Otherwise a
+        steady stream of commands would keep the wait from ever timing out and the counter would stall, and the ticks
+        that were due before a MultiplyCommand arrived would count with its new increment.'''
+        _run_due_ticks(state, schedule, publish, work_per_tick)
+
+        '''Handle each command by looking up its handler in the dispatch table. Anything after a StopCommand is
+        ignored.'''
+        for command in commands:
+            _COMMAND_HANDLERS[type(command)](state, command)
+            if not state.is_running:
+                break
+
+        '''As a final note, we could have created a second message queue to pass messages back to the main (UI) thread
+        from the worker thread. On the main thread, we could have set up a timer to poll that message queue and
+        process messages from the worker thread on the main thread. That approach is just as valid as using a channel
+        that schedules a method on the main thread. However, by scheduling method calls only as needed, we avoid
+        additional polling on the main thread.'''
+
+
+async def async_count_worker(command_queue, publish, tick_interval=1.0, catch_up=periodic.COALESCE):
+    """This is 'count_worker()' rewritten as an asyncio coroutine. Instead of getting a thread of its own, it runs as a
+    task on an asyncio event loop (when the app runs in async mode, that's the same loop that drives Kivy) and gives
+    the loop back whenever it waits. Thousands of these can share one thread, which makes them a good fit for I/O-bound
+    jobs like polling lots of devices. The catch is that a coroutine must never block or do long computations, because
+    while it runs, nothing else on the loop (including the UI) can. 'command_queue' is an 'asyncio.Queue' of Commands.
+    To stop the worker, either send it a StopCommand or simply cancel its task."""
+    state = _CountState()
+    schedule = periodic.DeadlineSchedule(tick_interval, catch_up)
+
+    while state.is_running:
+
+        '''If no commands are waiting, wait for one, but only until the next tick is due. 'await' hands control back
+        to the event loop until a command arrives or the timeout expires, at which point 'wait_for()' raises
+        'asyncio.TimeoutError'.'''
+        commands = []
+        if command_queue.empty():
+            try:
+                commands.append(await asyncio.wait_for(command_queue.get(), schedule.time_until_due()))
+            except asyncio.TimeoutError:
+                pass
+
+        '''Take every command that's waiting. Like the threaded worker, run the ticks that are due first, then handle
+        the commands with the same dispatch table.'''
+        while not command_queue.empty():
+            commands.append(command_queue.get_nowait())
+        _run_due_ticks(state, schedule, publish)
+        for command in commands:
+            _COMMAND_HANDLERS[type(command)](state, command)
+            if not state.is_running:
+                break
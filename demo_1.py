@@ -1,9 +1,60 @@
+'''Import startup.py first, so that its start-up timer includes the time spent importing everything else.'''
+import startup
+import callback_profiler
+import collections
+from frame_scheduler import FrameScheduler
+import frame_scheduler
+import os
+import periodic
+import session_log
 from kivy.app import App
-from kivy.clock import Clock
+from kivy.logger import Logger
 from kivy.uix.label import Label
 from kivy.uix.gridlayout import GridLayout
 
 
+class WidgetPool(object):
+    """A small pool of detached widgets that can be reattached later instead of building new ones from scratch.
+
+    Creating a Label isn't free: Kivy has to render its text into a texture, and a 150pt texture is a lot of pixels.
+    A Label that's removed from a layout keeps its texture, so if we hold onto it and reattach it later, Kivy can skip
+    all of that work. The pool hands out widgets with 'acquire()' and takes them back with 'release()'. It keeps at
+    most 'max_size' widgets on hand; if a widget is released when the pool is already full, the one that has been
+    waiting the longest is evicted and left for the garbage collector."""
+
+    def __init__(self, factory, max_size=1):
+        """'factory' is called with no arguments whenever the pool needs a new widget. A 'max_size' of zero disables
+        pooling, so every 'acquire()' creates a new widget."""
+        self._factory = factory
+        self._max_size = max_size
+        self._free_widgets = collections.deque()  # This will hold released widgets, oldest on the left
+
+        self.hits = 0  # This counts acquires that reused a pooled widget
+        self.misses = 0  # This counts acquires that had to create a new widget
+        self.evictions = 0  # This counts widgets that were dropped because the pool was full
+
+    def __len__(self):
+        return len(self._free_widgets)
+
+    def acquire(self):
+        """Returns a pooled widget if there is one, or a new one if not. Pooled widgets are handed out newest first
+        because they're the most likely to still have everything cached."""
+        if self._free_widgets:
+            self.hits += 1
+            return self._free_widgets.pop()
+        self.misses += 1
+        return self._factory()
+
+    def release(self, widget):
+        """Returns a widget to the pool. The widget must already be detached from its parent."""
+        if self._max_size <= 0:
+            return
+        if len(self._free_widgets) >= self._max_size:
+            self._free_widgets.popleft()
+            self.evictions += 1
+        self._free_widgets.append(widget)
+
+
 class DemoApp(App):
     """We create an application class called 'DemoApp' that subclasses from the Kivy 'App' class. It will inherit all
     of the 'App' class functionality and we override methods or add our own to introduce new functionality that's
@@ -21,6 +72,22 @@ class DemoApp(App):
     I like the encapsulation and readability hints that private variables provide.'''
     _layout = None  # This will hold our root layout widget
     _disappearing_label = None  # This will hold the label widget
+    _label_pool = None  # This will hold a pool of detached "Hello!" labels waiting to be reattached
+    _update_event = None  # This will hold the timer that calls _update()
+    _frame_scheduler = None  # This will hold the FrameScheduler that runs _update() within each frame's time budget
+
+    def __init__(self, label_pool_size=1, **kwargs):
+        """We override the constructor so that whoever creates the app can choose how many detached labels to keep
+        around for reuse. Any other keyword arguments are passed along to Kivy's App constructor untouched."""
+        super(DemoApp, self).__init__(**kwargs)
+
+        '''Create the label pool. We hand it a function that builds a new "Hello!" label for whenever the pool is
+        empty. 'lambda' creates a small, unnamed function right here in place.'''
+        self._label_pool = WidgetPool(lambda: Label(text="Hello!", font_size=150), max_size=label_pool_size)
+
+        '''Create the frame scheduler (see frame_scheduler.py) that our timer hands its UI changes to. It runs them in
+        an upcoming frame, but only as many as fit in the frame's time budget.'''
+        self._frame_scheduler = FrameScheduler()
 
     def build(self):
         """build() is a method provided by the App class. The App object calls this during initialization after run() is
@@ -43,8 +110,9 @@ class DemoApp(App):
         text_label = Label(text="Text:", font_size=150)
 
         '''Create another label. We're going to attach this to the grid layout below. Later, we'll detach and reattach 
-        it repeatedly, so we want to hold onto it at the class level. (hence 'self')'''
-        self._disappearing_label = Label(text="Hello!", font_size=150)
+        it repeatedly, so we want to hold onto it at the class level. (hence 'self') We get it from the label pool,
+        which is empty right now, so the pool will create a new Label for us.'''
+        self._disappearing_label = self._label_pool.acquire()
 
         '''Add the first label to the layout.'''
         self._layout.add_widget(text_label)
@@ -63,39 +131,80 @@ class DemoApp(App):
         method limited to code that constructs the UI and put other startup code in this 'on_start()' method instead.
         """
 
-        '''Schedule a Kivy timer to call our _update() method every 1 seconds.'''
-        Clock.schedule_interval(self._update, 1.0)
-
-    def _update(self, delta_time):
-        """_update() is our own private method that Kivy's Clock will call periodically to add/remove the "disappearing"
-        label. The Clock.schedule_interval() call expects a method with one parameter ('delta_time'). The Clock will
-        pass the time elapsed since the last call (or the original scheduling in the case of the first call). We do not
-        need this value for our purposes, so we'll just leave the parameter unused."""
+        '''Schedule a timer to call our _on_tick() method every 1 seconds. Kivy's own 'Clock.schedule_interval()'
+        would schedule each call one second after the previous one actually ran, so every late frame would push the
+        rest of the calls back a little. Our periodic module keeps the calls on a fixed one-second grid instead. If a
+        call is missed entirely (say the app was stuck for a few seconds), the SKIP policy just runs one call and
+        carries on from there, which is all a blinking label needs. It goes through our callback_profiler module,
+        which keeps track of how long each call takes and how late it runs if profiling has been turned on with the
+        DEMO_PROFILE_CALLBACKS environment variable. We hold onto the timer it returns because Kivy's Clock only keeps
+        a weak reference to it; if we dropped it, the garbage collector would quietly stop our timer.'''
+        self._update_event = periodic.schedule_periodic(self._on_tick, 1.0, periodic.SKIP)
+
+    def _on_tick(self, periods):
+        """The timer calls this every second. Rather than changing the UI right here, we submit our _update() method
+        to the frame scheduler, which runs it in an upcoming frame once there's room in that frame's time budget. In
+        this demo there's nothing else competing for the frame, so that's almost always right away."""
+        self._frame_scheduler.submit(self._update, periods)
+
+    def _update(self, periods):
+        """_update() is our own private method that the frame scheduler will call periodically to add/remove the
+        "disappearing" label. It's passed the number of one-second periods this call covers, which is always 1 with the
+        SKIP policy. We do not need this value for our purposes, so we'll just leave the parameter unused."""
 
         if self._disappearing_label is None:
             '''If the '_disappearing_label' instance variable is 'None', then we assume the label has been removed from
-            the Grid layout and deleted. Create a new Label and add it to the Grid layout.'''
+            the Grid layout. Get a Label from the label pool and add it to the Grid layout. If the pool is holding onto
+            the label we removed last time, we'll get that one back, texture and all. Otherwise, the pool creates a
+            new one.'''
+            self._disappearing_label = self._label_pool.acquire()
 
-            '''Add the label to the layout.'''
-            self._disappearing_label = Label(text="Hello!", font_size=150)
             '''Add the label to the layout.'''
             self._layout.add_widget(self._disappearing_label)
+
+            '''A new label hasn't rendered its text yet. Render it now rather than later in the frame, so that the frame
+            scheduler's budget covers it (see frame_scheduler.py). A pooled label still has its texture, so there's
+            nothing to do.'''
+            if self._disappearing_label.texture is None:
+                frame_scheduler.render_now(self._disappearing_label)
         else:
             '''If the '_disappearing_label' instance variable is not 'None', then we assume the label is currently 
-            attached to the Grid layout. Remove it from the layout and delete it.'''
+            attached to the Grid layout. Remove it from the layout and hand it back to the pool.'''
 
             '''Remove the label from the layout.'''
             self._layout.remove_widget(self._disappearing_label)
 
-            '''Set the instance variable to 'None'. Now we've 'lost' the Label object since nothing points to it. The
-            Python garbage collector will eventually detect this and free the orphaned 'Label' object from memory (but
-            we don't have to worry about that).'''
+            '''Release the label to the pool so that we can reuse it next time. If the pool is full (or pooling is
+            disabled), the pool drops it, and then nothing points to the Label object anymore. The Python garbage
+            collector will eventually detect this and free the orphaned 'Label' object from memory (but we don't have
+            to worry about that).'''
+            self._label_pool.release(self._disappearing_label)
+
+            '''Set the instance variable to 'None' so that we know the label is no longer attached.'''
             self._disappearing_label = None
 
+    def on_stop(self):
+        """Event handler for the `on_stop` event which is fired when the app is closed. We log how often the label pool
+        let us reuse a label rather than build a new one."""
+        Logger.info("DemoApp: label pool hits=%d misses=%d evictions=%d" % (
+            self._label_pool.hits,
+            self._label_pool.misses,
+            self._label_pool.evictions))
+        Logger.info("DemoApp: frame scheduler %s" % self._frame_scheduler.stats())
+
+        '''Log (or save) the profiler's numbers. This does nothing if profiling is turned off.'''
+        callback_profiler.dump()
+
 
 if __name__ == "__main__":
-    '''Construct an instance of the DemoApp class.'''
-    demo_app = DemoApp()
+    '''Construct an instance of the DemoApp class. Set the DEMO_LABEL_POOL_SIZE environment variable to change how many
+    detached labels the app keeps around for reuse (zero turns pooling off). Set the DEMO_RECORD_SESSION environment
+    variable to a file name to record the session for 'benchmarks.replay'.'''
+    startup.mark('imports')
+    app_kwargs = {'label_pool_size': int(os.environ.get('DEMO_LABEL_POOL_SIZE', '1'))}
+    demo_app = DemoApp(**app_kwargs)
+    startup.track(demo_app)
+    session_log.record_from_environment(demo_app, 'demo_1', app_kwargs)
 
     '''Start the instance running.'''
     demo_app.run()
@@ -1,17 +1,47 @@
+'''Import startup.py first, so that its start-up timer includes the time spent importing everything else.'''
+import startup
+import callback_profiler
+from frame_scheduler import FrameScheduler
+import frame_scheduler
 from kivy.app import App
-from kivy.clock import Clock
+from kivy.logger import Logger
 from kivy.uix.label import Label
 from kivy.uix.gridlayout import GridLayout
+import os
+import periodic
+import session_log
 
 
 class DemoApp(App):
     _layout = None  # This will hold our root layout widget
     _disappearing_label = None  # This will hold the disappearing label widget
     _counter_label = None  # This will hold the counting label widget
+    _update_event = None  # This will hold the timer that calls _update()
+    _frame_scheduler = None  # This will hold the FrameScheduler that runs _update() within each frame's time budget
 
     _counter = 0  # This will be our counter
+    _use_digit_counter = False  # This will track whether to display the counter with a DigitCounter widget
+
+    _grid_size = None  # This will hold the (rows, columns) of the stress-test grid, or None for the normal demo
+    _grid_cells = None  # This will hold every counter widget in the stress-test grid
+    _batch = None  # This will hold the BatchedUpdates that applies the grid's changes once per frame
+    _use_batch = False  # This will track whether the grid's changes go through a BatchedUpdates
+
+    def __init__(self, digit_counter=False, grid_size=None, batch_updates=False, **kwargs):
+        """We override the constructor so that whoever creates the app can choose to display the counter with a
+        DigitCounter widget instead of a Label, and can ask for a stress test that replaces the demo with a grid of
+        'grid_size' (a '(rows, columns)' tuple) counters instead. 'batch_updates' says whether the grid's changes go
+        through a BatchedUpdates or are set on the cells directly, so that the two can be compared. Any other keyword
+        arguments are passed along to Kivy's App constructor untouched."""
+        super(DemoApp, self).__init__(**kwargs)
+        self._use_digit_counter = digit_counter
+        self._grid_size = grid_size
+        self._use_batch = batch_updates
+        self._frame_scheduler = FrameScheduler()
 
     def build(self):
+        if self._grid_size is not None:
+            return self._build_grid()
 
         self._layout = GridLayout(cols=2)
 
@@ -28,21 +58,86 @@ class DemoApp(App):
 
         '''Now create and add yet another label. When we created the Grid Layout, we specified that it should contain
         two columns. Because we already added two labels above, adding this third label will cause the Grid Layout to
-        create a new row. This label will appear in the first column of the second row.'''
-        self._layout.add_widget(Label(text="Counter:", font_size=150, size_hint=(0.5, 0.5)))
+        create a new row. This label will appear in the first column of the second row.
+
+        The first frame can go up without the second row, so we hand this label, and the counter label after it, to
+        'startup.add_after_first_frame()'. In fast-start mode (see startup.py), it holds their places with empty
+        placeholders and only creates them once the first frame has been drawn. Otherwise, it just adds them now. That's
+        why we hand it a function that creates the widget rather than the widget itself.'''
+        startup.add_after_first_frame(
+            self._layout, lambda: Label(text="Counter:", font_size=150, size_hint=(0.5, 0.5)), size_hint=(0.5, 0.5))
+        startup.add_after_first_frame(self._layout, self._create_counter_label, size_hint=(0.5, 0.5))
+
+        '''In fast-start mode, render the text the second row and the counter updates are going to need, once the first
+        frame has been drawn, so that they don't have to wait for it.'''
+        startup.warm_up(startup.render_text, ["Counter:", "0123456789"], 150)
+        if self._use_digit_counter:
+            import digit_counter
+            startup.warm_up(digit_counter.warm_glyphs, 'Roboto', 150)
 
-        '''Create and add a counter label. We'll use Python's string formatting operator ('%') to dynamically create the
-        label's text from our counter variable. Read more about this operator at:
-        https://docs.python.org/3/library/stdtypes.html#printf-style-string-formatting'''
-        self._counter_label = Label(text="%s" % self._counter, font_size=150, size_hint=(0.5, 0.5))
-        self._layout.add_widget(self._counter_label)
+        return self._layout
+
+    def _create_counter_label(self):
+        """Creates the counter label and returns it. 'build()' hands this method to
+        'startup.add_after_first_frame()'."""
 
+        '''Create the counter label. We'll use Python's string formatting operator ('%') to dynamically create the
+        label's text from our counter variable. Read more about this operator at:
+        https://docs.python.org/3/library/stdtypes.html#printf-style-string-formatting
+
+        A Label re-renders all of its text every time the text changes. If we've been asked to, we use a DigitCounter
+        instead (see digit_counter.py). It has the same 'text' property, so the rest of the demo doesn't need to know
+        which one it's talking to, but it draws each digit from a cache rather than re-rendering them all. We only
+        import it when we need it, so that the app doesn't pay for importing it otherwise.'''
+        if self._use_digit_counter:
+            from digit_counter import DigitCounter
+            self._counter_label = DigitCounter(text="%s" % self._counter, font_size=150, size_hint=(0.5, 0.5))
+        else:
+            self._counter_label = Label(text="%s" % self._counter, font_size=150, size_hint=(0.5, 0.5))
+        return self._counter_label
+
+    def _build_grid(self):
+        """Builds the stress-test grid: 'rows' x 'columns' small counters that all change on every tick, like a
+        dashboard with thousands of cells."""
+        rows, columns = self._grid_size
+        self._layout = GridLayout(cols=columns)
+        self._grid_cells = []
+        if self._use_digit_counter:
+            from digit_counter import DigitCounter
+        for _ in range(rows * columns):
+            if self._use_digit_counter:
+                cell = DigitCounter(text="0", font_size=14)
+            else:
+                cell = Label(text="0", font_size=14)
+            self._layout.add_widget(cell)
+            self._grid_cells.append(cell)
+
+        '''Every tick changes every cell's text exactly once, so there's nothing for a BatchedUpdates to save: recording
+        each change and applying it later only adds work, and the layout doesn't care either way, because the cells
+        never change size. So, by default, the update sets the properties directly. If we've been asked to, it hands
+        them to a BatchedUpdates instead, so that the two can be compared.'''
+        if self._use_batch:
+            from batched_updates import BatchedUpdates
+            self._batch = BatchedUpdates()
         return self._layout
 
     def on_start(self):
-        Clock.schedule_interval(self._update, 1.0)
+        '''Count seconds on a fixed grid (see periodic.py). If the app falls behind by a few seconds, COALESCE hands
+        the next call all of the missed periods at once so that the counter still matches the time that has passed.'''
+        self._update_event = periodic.schedule_periodic(self._on_tick, 1.0, periodic.COALESCE)
+
+    def on_stop(self):
+        Logger.info("DemoApp: frame scheduler %s" % self._frame_scheduler.stats())
+        callback_profiler.dump()
+
+    def _on_tick(self, periods):
+        '''Like demo_1, hand the UI changes to the frame scheduler rather than making them right away.'''
+        if self._grid_cells is not None:
+            self._update_grid(periods)
+        else:
+            self._frame_scheduler.submit(self._update, periods)
 
-    def _update(self, delta_time):
+    def _update(self, periods):
         if self._disappearing_label.opacity > 0:
             '''To prevent the text from jumping around, we're going to change the opacity of the label to hide/show it
             instead of adding/removing it from the layout. If the opacity is greater than zero, assume the label is
@@ -57,11 +152,67 @@ class DemoApp(App):
             the label semi-transparent.'''
             self._disappearing_label.opacity = 1
 
-        '''Increment the counter and update the counter label's text.'''
-        self._counter += 1
-        self._counter_label.text = "%s" % self._counter
+        '''Add the number of seconds that have passed to the counter and update the counter label's text. (In
+        fast-start mode, the counter label might not have been created yet; if so, it'll start from the counter when it
+        is.)'''
+        self._counter += periods
+        if self._counter_label is not None:
+            self._counter_label.text = "%s" % self._counter
+
+            '''Render the new text now rather than later in the frame, so that the frame scheduler's budget covers it
+            (see frame_scheduler.py).'''
+            frame_scheduler.render_now(self._counter_label)
+
+    def _update_grid(self, periods):
+        """Updates every cell of the stress-test grid: each cell shows the counter plus its own position, so that no two
+        cells share a texture, and every other cell blinks, like the disappearing label does in the normal demo."""
+        self._counter += periods
+
+        '''Updating a big grid takes far longer than a frame's budget, and the frame scheduler can't split up a change
+        once it's running. So, we hand it one change per row instead, and it runs as many rows as fit in each frame,
+        spreading the update across as many frames as it needs. The grid is the least urgent thing on screen, so the
+        rows go in at low priority. Each row is told the counter it's showing, so that every row of this update shows
+        the same counter, even if the next tick comes along before the last row has run.'''
+        columns = self._grid_size[1]
+        for first_index in range(0, len(self._grid_cells), columns):
+            self._frame_scheduler.submit(
+                self._update_grid_row, first_index, columns, self._counter, priority=frame_scheduler.LOW)
+
+    def _update_grid_row(self, first_index, count, counter):
+        """Updates 'count' cells of the stress-test grid, starting with the cell at 'first_index', to show 'counter'."""
+        is_blink_visible = counter % 2 == 0
+        cells = self._grid_cells[first_index:first_index + count]
+        for index, cell in enumerate(cells, first_index):
+            if self._batch is None:
+                cell.text = "%s" % (counter + index)
+                if index % 2:
+                    cell.opacity = 1 if is_blink_visible else 0
+            elif index % 2:
+                self._batch.set(cell, text="%s" % (counter + index), opacity=1 if is_blink_visible else 0)
+            else:
+                self._batch.set(cell, text="%s" % (counter + index))
+
+        '''Apply the batch and render the row's new text before we return, rather than in the triggers that would
+        otherwise run later in the frame, so that the frame scheduler's budget covers all of it.'''
+        if self._batch is not None:
+            self._batch.apply()
+        for cell in cells:
+            frame_scheduler.render_now(cell)
 
 
 if __name__ == "__main__":
-    '''Construct and run an instance of the DemoApp class.'''
-    DemoApp().run()
+    '''Construct and run an instance of the DemoApp class. Set the DEMO_DIGIT_COUNTER environment variable to 1 to
+    display the counter with a DigitCounter widget. Set the DEMO_GRID environment variable to something like '40x25'
+    to run the stress test with a grid of that many rows and columns of counters instead, and set DEMO_GRID_BATCH to 1
+    to have the stress test batch its changes instead of setting them directly. Set the DEMO_RECORD_SESSION
+    environment variable to a file name to record the session for 'benchmarks.replay'. Set the DEMO_FAST_START
+    environment variable to 1 to create the bottom row after the first frame (see startup.py).'''
+    startup.mark('imports')
+    grid = os.environ.get('DEMO_GRID')
+    app_kwargs = {'digit_counter': os.environ.get('DEMO_DIGIT_COUNTER', '0') == '1',
+                  'grid_size': tuple(int(size) for size in grid.split('x')) if grid else None,
+                  'batch_updates': os.environ.get('DEMO_GRID_BATCH', '0') == '1'}
+    demo_app = DemoApp(**app_kwargs)
+    startup.track(demo_app)
+    session_log.record_from_environment(demo_app, 'demo_2', app_kwargs)
+    demo_app.run()
@@ -1,22 +1,143 @@
-import collections
+'''Import startup.py first, so that its start-up timer includes the time spent importing everything else.'''
+import startup
+import asyncio
+from async_worker_pool import AsyncWorkerPool
+import callback_profiler
+from command_queue import CommandQueue, MultiplyCommand, StopCommand
+import command_queue
+from counter_formatter import BackgroundFormatter, CounterFormatter
+from counter_worker import count_worker
 from kivy.app import App
-from kivy.clock import Clock, mainthread
+from kivy.logger import Logger
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.gridlayout import GridLayout
-import time
+from frame_scheduler import FrameScheduler
+import frame_scheduler
+import os
+from process_worker_pool import ProcessWorkerPool
+import session_log
+from shared_counter import SharedCounterBlock, SharedMemoryWorker
 import threading
 
+class LatestValueChannel(object):
+    """A channel for passing values from a worker thread to the main thread where only the newest value matters.
+
+    Kivy's '@mainthread' decorator schedules a separate callback for every call. If a worker produces values faster
+    than the UI draws frames, those callbacks pile up and the UI falls further and further behind, painstakingly
+    displaying values that are already out of date. This channel instead holds onto only the latest published value
+    and keeps at most one callback scheduled on the Clock at a time. When that callback runs on the main thread, it
+    applies whatever value is newest and any values published in between are simply dropped."""
+
+    def __init__(self, callback, scheduler=None, priority=frame_scheduler.NORMAL):
+        """'callback' is called on the main thread with the latest value, so it's safe for it to touch UI elements. If
+        a FrameScheduler is given, the callback runs through it, with the given priority, so that it only runs when
+        there's room in the frame's budget. Otherwise, it's scheduled on the Clock directly."""
+        self._callback = callback
+        self._scheduler = scheduler
+        self._priority = priority
+
+        '''The lock protects the fields below, which are written by the worker thread and read by the main thread.'''
+        self._lock = threading.Lock()
+        self._value = None  # This will hold the most recently published value
+        self._is_pending = False  # This will track whether a callback is already scheduled on the Clock
+
+        self.published_count = 0  # This counts every value handed to publish()
+        self.applied_count = 0  # This counts the values that actually reached the callback
+
+    @property
+    def dropped_count(self):
+        """The number of published values that were superseded before the main thread got around to applying them."""
+        return self.published_count - self.applied_count
+
+    def publish(self, value):
+        """Publish a new value. This is safe to call from any thread and never waits on the main thread."""
+        with self._lock:
+            self._value = value
+            self.published_count += 1
+
+            '''If a callback is already scheduled, it will pick up the value we just stored, so we're done.'''
+            if self._is_pending:
+                return
+            self._is_pending = True
+
+        '''Both FrameScheduler.submit() and Clock.schedule_once() are safe to call from other threads. The latter is
+        the same mechanism that '@mainthread' uses under the hood. We go through callback_profiler so that, if
+        profiling is turned on, we can see how long updates wait to reach the main thread.'''
+        if self._scheduler is not None:
+            self._scheduler.submit(self._apply, 0, priority=self._priority)
+        else:
+            callback_profiler.schedule_once(self._apply)
+
+    def _apply(self, delta_time):
+        """Runs on the main thread and hands the newest value to the callback."""
+        with self._lock:
+            value = self._value
+            self._is_pending = False
+            self.applied_count += 1
+
+        '''Call the callback outside of the lock so a slow UI update never holds up the worker thread.'''
+        self._callback(value)
+
 
 class DemoApp(App):
     _layout = None  # This will hold our root layout widget
     _start_stop_button = None  # This will hold our start/stop button widget
     _10x_button = None  # This will hold our 10x button widget
     _counter_label = None  # This will hold the counting label widget
+    _counter_text = "0"  # This will hold the newest counter text
 
     _is_running = False  # This will track whether our counter is running
     _worker_thread = None  # This will hold the worker Thread object
     _thread_queue = None  # This will hold a queue for communicating with the worker thread
+    _command_queue_depth = 16  # This is the most commands the worker thread's queue will hold
+    _command_overflow = command_queue.MERGE  # This will hold the queue's policy for commands that arrive when it's full
+    _counter_channel = None  # This will hold the channel the worker thread uses to publish counter values
+
+    _worker_processes = 0  # This will hold the number of worker processes to use (zero means use one worker thread)
+    _process_pool = None  # This will hold the ProcessWorkerPool while worker processes are running
+    _use_shared_memory = False  # This will track whether to count in a worker process that uses shared memory
+    _shared_memory_worker = None  # This will hold the SharedMemoryWorker while it's running
+    _shared_counter_sequence = 0  # This will hold the last sequence number we read from the shared memory block
+    _shared_counter_event = None  # This will hold the Clock event that reads the shared memory block every frame
+    _async_workers = 0  # This will hold the number of asyncio workers to use (zero means don't use asyncio)
+    _async_pool = None  # This will hold the AsyncWorkerPool while asyncio workers are running
+    _use_digit_counter = False  # This will track whether to display the counter with a DigitCounter widget
+    _counter_formatter = None  # This will hold the CounterFormatter that turns counter values into label text
+    _background_formatter = None  # This will hold the BackgroundFormatter for workers that deliver on the main thread
+    _frame_scheduler = None  # This will hold the FrameScheduler that paces our UI updates
+
+    def __init__(self, worker_processes=0, shared_memory_worker=False, async_workers=0, digit_counter=False,
+                 counter_display=CounterFormatter.FULL, command_overflow=command_queue.MERGE, **kwargs):
+        """We override the constructor so that whoever creates the app can choose how many worker processes to count
+        with, whether to count in a single worker process that shares memory with the app, how many asyncio workers to
+        count with (the app must then be started with 'async_run()' instead of 'run()'), whether to display the
+        counter with a DigitCounter widget (see demo_2), how to display counters that get too long to read (one of
+        the CounterFormatter modes), and what the worker thread's command queue does when it's full (one of the
+        command_queue overflow policies). Any other keyword arguments are passed along to Kivy's App constructor
+        untouched."""
+        super(DemoApp, self).__init__(**kwargs)
+        self._worker_processes = worker_processes
+        self._use_shared_memory = shared_memory_worker
+        self._async_workers = async_workers
+        self._use_digit_counter = digit_counter
+        self._counter_formatter = CounterFormatter(counter_display)
+
+        '''The asyncio workers and the shared memory reader hand us counter values on the main thread. Rather than
+        format them there, they hand them to a BackgroundFormatter, which formats them on a thread of its own and
+        publishes the text to the channel, just like the worker thread does. We look the channel up each time rather
+        than holding onto its 'publish()' method, because the channel doesn't exist until 'build()' (and a session
+        recorder may swap its 'publish()' method after that).'''
+        self._background_formatter = BackgroundFormatter(
+            self._counter_formatter, lambda counter_text: self._counter_channel.publish(counter_text))
+        if command_overflow not in command_queue.OVERFLOW_POLICIES:
+            raise ValueError("Unknown command overflow policy '%s' (expected one of: %s)" % (
+                command_overflow, ", ".join(command_queue.OVERFLOW_POLICIES)))
+        self._command_overflow = command_overflow
+
+        '''Counter updates go through a FrameScheduler (see frame_scheduler.py), so that however fast they arrive,
+        they only take up a limited slice of each frame.'''
+        self._frame_scheduler = FrameScheduler()
 
     def build(self):
         self._layout = GridLayout(cols=2)
@@ -25,8 +146,9 @@ class DemoApp(App):
         between "start" and "stop" when it's pressed.'''
         self._start_stop_button = Button(text='Start', size_hint=(0.5, 0.1))
         '''Bind our callback method to the button's "on_press" event. This tells Kivy to call our method when this 
-        button is pressed.'''
-        self._start_stop_button.bind(on_press=self._on_start_button_press)
+        button is pressed. 'callback_profiler.profiled()' hands our method straight back unless profiling has been
+        turned on (see demo_1), in which case it wraps the method to time each call.'''
+        self._start_stop_button.bind(on_press=callback_profiler.profiled(self._on_start_button_press))
         '''Add the button to the layout'''
         self._layout.add_widget(self._start_stop_button)
 
@@ -35,7 +157,7 @@ class DemoApp(App):
         self._10x_button = Button(text='10x', size_hint=(0.5, 0.1))
         '''Bind our callback method to the button's "on_press" event. This tells Kivy to call our method when this 
         button is pressed.'''
-        self._10x_button.bind(on_press=self._on_10x_button_press)
+        self._10x_button.bind(on_press=callback_profiler.profiled(self._on_10x_button_press))
         '''Add the button to the layout'''
         self._layout.add_widget(self._10x_button)
         '''Set the 10x button to "disabled" so the user can't click it. We only want it enabled after the "start" button
@@ -45,15 +167,37 @@ class DemoApp(App):
         work.'''
         self._10x_button.disabled = True
 
-        '''Create and add a static counter label.'''
-        self._layout.add_widget(Label(text="Counter:", font_size=150, size_hint=(0.5, 0.5)))
-
-        '''Create and add the counter label.'''
-        self._counter_label = Label(text="0", font_size=150, size_hint=(0.5, 0.5))
-        self._layout.add_widget(self._counter_label)
+        '''Create and add a static counter label, and then the counter label. The buttons are all the first frame
+        needs, so, as in demo_2, these go through 'startup.add_after_first_frame()', which creates them after the first
+        frame in fast-start mode (see startup.py) and right away otherwise.'''
+        startup.add_after_first_frame(
+            self._layout, lambda: Label(text="Counter:", font_size=150, size_hint=(0.5, 0.5)), size_hint=(0.5, 0.5))
+        startup.add_after_first_frame(self._layout, self._create_counter_label, size_hint=(0.5, 0.5))
+
+        '''In fast-start mode, render the text the second row and the counter updates are going to need, once the first
+        frame has been drawn.'''
+        startup.warm_up(startup.render_text, ["Counter:", "0123456789"], 150)
+        if self._use_digit_counter:
+            import digit_counter
+            startup.warm_up(digit_counter.warm_glyphs, 'Roboto', 150)
+
+        '''Create the channel that the worker thread will use to send counter text to the UI. The channel calls
+        '_update_data()' on the main thread with the newest text, at most once per frame, by way of the frame
+        scheduler.'''
+        self._counter_channel = LatestValueChannel(self._update_data, self._frame_scheduler)
 
         return self._layout
 
+    def _create_counter_label(self):
+        """Creates the counter label and returns it. 'build()' hands this method to 'startup.add_after_first_frame()'.
+        Like demo_2, we only import DigitCounter if we're going to use it."""
+        if self._use_digit_counter:
+            from digit_counter import DigitCounter
+            self._counter_label = DigitCounter(text=self._counter_text, font_size=150, size_hint=(0.5, 0.5))
+        else:
+            self._counter_label = Label(text=self._counter_text, font_size=150, size_hint=(0.5, 0.5))
+        return self._counter_label
+
     def on_start(self):
         """We'll start the counter thread when the user clicks the 'start' button, so there's nothing to do on app
         launch. We could remove the 'on_start()' method override now, but we'll keep it around in case we want to use
@@ -63,31 +207,176 @@ class DemoApp(App):
     def on_stop(self):
         """Event handler for the `on_stop` event which is fired when the app is closed."""
 
-        '''If the user closes the app without first hitting the 'stop' button, then the thread will still be running.
-        We need to stop it; otherwise, the app window will disappear, but Python will hang indefinitely waiting for the
-        thread to terminate. So, we call '_stop_thread()' here to ensure that the thread is shut down. This method
-        checks whether the thread is running and only attempts to terminate it if it is. So, it's safe to call here
+        '''If the user closes the app without first hitting the 'stop' button, then the workers will still be running.
+        We need to stop them; otherwise, the app window will disappear, but Python will hang indefinitely waiting for
+        them to terminate. So, we call '_stop_workers()' here to ensure that they're shut down. This method checks
+        whether the workers are running and only attempts to terminate them if they are. So, it's safe to call here
         without a guard.'''
+        self._stop_workers()
+        self._background_formatter.shutdown()
+
+        '''Log how many counter values the worker published and how many the UI actually displayed. If the worker
+        ever outpaces the UI, the difference shows up here as dropped values.'''
+        Logger.info("DemoApp: counter values published=%d applied=%d dropped=%d" % (
+            self._counter_channel.published_count,
+            self._counter_channel.applied_count,
+            self._counter_channel.dropped_count))
+
+        '''If the worker thread ran, log how its command queue coped. Merged or dropped commands mean the button was
+        pressed faster than the worker handled the presses.'''
+        if self._thread_queue is not None:
+            Logger.info("DemoApp: commands sent=%d merged=%d dropped=%d blocked=%d max_depth=%d" % (
+                self._thread_queue.put_count,
+                self._thread_queue.merged_count,
+                self._thread_queue.dropped_count,
+                self._thread_queue.blocked_count,
+                self._thread_queue.max_depth_seen))
+
+        '''Log how the frame scheduler coped. Overrun frames are ones where the updates took more than their share of
+        the frame.'''
+        Logger.info("DemoApp: frame scheduler %s" % self._frame_scheduler.stats())
+
+        '''Log (or save) the profiler's numbers. This does nothing if profiling is turned off.'''
+        callback_profiler.dump()
+
+    def _start_workers(self):
+        """This is our own helper method for starting either the worker thread or the pool of worker processes,
+        depending upon how the app was constructed."""
+        if self._worker_processes > 0:
+            self._start_process_pool()
+        elif self._use_shared_memory:
+            self._start_shared_memory_worker()
+        elif self._async_workers > 0:
+            self._start_async_pool()
+        else:
+            self._start_thread()
+
+    def _stop_workers(self):
+        """This is our own helper method for stopping whichever kind of worker is running."""
+        self._stop_process_pool()
+        self._stop_shared_memory_worker()
+        self._stop_async_pool()
         self._stop_thread()
 
+    def _send_command(self, command):
+        """This is our own helper method for sending a Command (see command_queue.py) to every running worker."""
+        if self._process_pool is not None:
+            self._process_pool.broadcast(command)
+        elif self._shared_memory_worker is not None:
+            self._shared_memory_worker.send_command(command)
+        elif self._async_pool is not None:
+            self._async_pool.broadcast(command)
+        else:
+            self._thread_queue.put(command)
+
+    def _start_shared_memory_worker(self):
+        """This is our own helper method for starting a worker process that shares memory with the app."""
+
+        '''Guard against starting a second worker while the first is running.'''
+        if self._shared_memory_worker is None:
+            self._shared_memory_worker = SharedMemoryWorker()
+            self._shared_memory_worker.start()
+            self._shared_counter_sequence = 0
+
+            '''The worker doesn't tell us when the counter changes; it just writes the new value into shared memory.
+            So, we schedule '_read_shared_counter()' to run once every frame (an interval of zero means "every frame")
+            and look for changes there.'''
+            self._shared_counter_event = callback_profiler.schedule_interval(self._read_shared_counter, 0)
+
+    def _stop_shared_memory_worker(self):
+        """This is our own helper method for stopping the worker process that shares memory with the app."""
+
+        '''Guard against trying to shut down a worker that isn't running.'''
+        if self._shared_memory_worker is not None:
+            self._shared_counter_event.cancel()
+            self._shared_memory_worker.stop()
+            self._shared_memory_worker = None
+
+    def _read_shared_counter(self, delta_time):
+        """Kivy's Clock calls this once per frame while the shared memory worker is running. It checks the shared
+        memory block and updates the counter label if the worker has written anything new since the last frame."""
+        result = self._shared_memory_worker.read_if_changed(self._shared_counter_sequence)
+        if result is None:
+            return
+        self._shared_counter_sequence, status, counter_value = result
+
+        '''The worker process only shares the raw counter with us, and we're on the main thread, so we hand it to the
+        background formatter rather than format it here. It publishes the text to the channel like the other workers
+        do, so the label update runs within the frame scheduler's budget. "Overflow" goes the same way, so that it
+        can't be overtaken by the text of a value we handed over earlier.'''
+        if status == SharedCounterBlock.STATUS_OVERFLOWED:
+            self._background_formatter.submit("Overflow")
+        else:
+            self._background_formatter.submit(counter_value)
+
+    def _start_process_pool(self):
+        """This is our own helper method for starting a pool of worker processes."""
+
+        '''Guard against starting a second pool while the first is running.'''
+        if self._process_pool is None:
+
+            '''The pool publishes the sum of all workers' counters from a background thread, so we hand it the same
+            method that the worker thread uses to format the total and publish it to the channel. The channel gets
+            the text onto the main thread for us.'''
+            self._process_pool = ProcessWorkerPool(self._worker_processes, self._publish_counter)
+            self._process_pool.start()
+
+    def _stop_process_pool(self):
+        """This is our own helper method for stopping the pool of worker processes."""
+
+        '''Guard against trying to shut down a pool that isn't running.'''
+        if self._process_pool is not None:
+
+            '''Like joining the worker thread, this waits for the worker processes to exit. They wake up as soon as
+            the StopCommand arrives, so this is quick.'''
+            self._process_pool.stop()
+            self._process_pool = None
+
+    def _start_async_pool(self):
+        """This is our own helper method for starting a pool of asyncio workers."""
+
+        '''Guard against starting a second pool while the first is running.'''
+        if self._async_pool is None:
+
+            '''The workers run on the same thread as Kivy, so they could set the label text themselves, but turning a
+            big counter into text would hold up the UI. So, we hand the total to the background formatter, which
+            formats it on its own thread and publishes the text to the channel, which coalesces a flood of updates
+            into one label change per frame.'''
+            self._async_pool = AsyncWorkerPool(self._async_workers, self._background_formatter.submit)
+            self._async_pool.start()
+
+    def _stop_async_pool(self):
+        """This is our own helper method for stopping the pool of asyncio workers."""
+
+        '''Guard against trying to stop a pool that isn't running.'''
+        if self._async_pool is not None:
+
+            '''Unlike joining a thread, this doesn't wait: it cancels the workers' tasks, and they finish the next
+            time the event loop gets to them. The UI never freezes, however many workers there are.'''
+            self._async_pool.stop()
+            self._async_pool = None
+
     def _start_thread(self):
         """This is our own helper method for starting a worker thread and creating a queue for communicating with it."""
 
         '''Guard against spawning a second worker thread while the first is running.'''
         if not self._is_running:
 
-            '''Python's deque (double-ended queue: https://docs.python.org/3.7/library/collections.html#collections.deque)
-            is safe to use across threads if you write to one end and read from the other. We'll use it as a very simple
-            message queue to pass messages from the UI to the worker thread. This could be constructed once upon app 
-            startup and reused; however, we'll recreate it and replace any old deque every time we start the thread. This
-            isn't very expensive to do and it has the advantage of ensuring the message queue is empty when we start the
-            thread.'''
-            self._thread_queue = collections.deque()
-
-            '''This creates a Thread object that will run our '_worker()' method in another thread. Our '_worker()' method
-            doesn't currently expect any arguments (except 'self'). If we wanted to pass arguments to it, we could change
-            its signature to add parameters and then pass them in using the 'args' tuple when we construct the Thread
-            object here.'''
+            '''Our CommandQueue (see command_queue.py) is a thread-safe first-in, first-out queue, much like Python's
+            Queue (https://docs.python.org/3/library/queue.html). We'll use it as a very simple message queue to pass
+            commands from the UI to the worker thread. Unlike a bare deque, it lets the worker thread block while
+            waiting for a command, with a timeout, so the worker can sleep until either its next tick is due or a
+            command arrives--whichever comes first. Unlike Python's Queue, it holds only a limited number of commands
+            and applies an overflow policy when it's full, so it can't grow without limit. This could be constructed
+            once upon app startup and reused; however, we'll recreate it and replace any old queue every time we start
+            the thread. This isn't very expensive to do and it has the advantage of ensuring the message queue is empty
+            when we start the thread.'''
+            self._thread_queue = CommandQueue(self._command_queue_depth, self._command_overflow)
+
+            '''This creates a Thread object that will run our '_worker()' method in another thread. Our '_worker()'
+            method doesn't currently expect any arguments (except 'self'). If we wanted to pass arguments to it, we
+            could change its signature to add parameters and then pass them in using the 'args' tuple when we construct
+            the Thread object here.'''
             self._worker_thread = threading.Thread(
                 target=self._worker,
                 args=())
@@ -104,16 +393,18 @@ class DemoApp(App):
         '''Guard against trying to shut down a worker thread that's already terminated.'''
         if self._is_running:
 
-            '''Append a 'die' message to the message queue. This will signal to the worker thread that we want it to 
-            shut down as soon as possible.'''
-            self._thread_queue.appendleft(('die', 0))
+            '''Put a StopCommand on the message queue. This will wake the worker thread and signal to it that we want
+            it to shut down as soon as possible. A StopCommand can't be merged or dropped, so if the queue happens to be
+            full, this waits (briefly) for the worker to make room.'''
+            self._thread_queue.put(StopCommand())
 
             '''Use join() to wait for the thread to terminate. It's possible to specify a timeout in case the thread
             hangs, but for this demo, we'll just wait indefinitely. Because this 'join()' blocks the main thread, the UI
             will freeze until the worker thread terminates and this join() call exits, so it's important to have the
-            worker thread check its message queue somewhat frequently. Alternatively, if it's safe for your code to 
+            worker thread respond to its message queue promptly. Our worker blocks on the queue itself, so it wakes up
+            and handles the StopCommand within a few milliseconds. Alternatively, if it's safe for your code to 
             spawn a new thread before the old one completely shuts down, you could choose to not use 'join()' here at
-            all--you could just send the 'die' message and assume that the thread will eventually terminate. This keeps
+            all--you could just send the StopCommand and assume that the thread will eventually terminate. This keeps
             the UI responsive, but it could result in launching multiple threads if they take a while to terminate and
             the user keeps clicking the button.'''
             self._worker_thread.join()
@@ -137,8 +428,8 @@ class DemoApp(App):
             '''Enable the 10x button'''
             self._10x_button.disabled = False
 
-            '''Start the worker thread'''
-            self._start_thread()
+            '''Start the worker thread (or processes)'''
+            self._start_workers()
 
         else:
             '''The user just clicked "Stop." Update the start/stop button text to "Start"'''
@@ -147,8 +438,8 @@ class DemoApp(App):
             '''Disable the 10x button'''
             self._10x_button.disabled = True
 
-            '''Stop the worker thread'''
-            self._stop_thread()
+            '''Stop the worker thread (or processes)'''
+            self._stop_workers()
 
     def _on_10x_button_press(self, instance):
         """_on_10x_button_press() is our own private method that we bound to the 10x button. This button is enabled
@@ -159,82 +450,70 @@ class DemoApp(App):
         the button being disabled and skip that check. If, for some reason, this method is called while the button is
         supposed to be disabled (and thus when the counter is not running), then that's likely programmer error."""
 
-        '''Add a '10x' message to the queue. This will tell the worker thread to multiply the counter increment by 10.
-        We actually append a tuple '('10x', 0)' to demonstrate how to send a command and associated data as a message;
-        however, the second value of the tuple ('0') is currently ignored.'''
-        self._thread_queue.appendleft(('10x', 0))
-
-    @mainthread
-    def _update_data(self, counter_value):
-        """This helper method updates the counter label text. We've decorated it with Kivy's '@mainthread' decorator.
-        This is 'magic' (a.k.a 'syntactic sugar') that will ensure that this method will always run in the main thread.
-        Kivy (and most UI frameworks) are not inherently thread-safe and require that updates to UI elements happen in
-        the main thread. The "@mainthread" decorator ensures that any call to our '_update_data()' method is wrapped
-        with a call to 'kivy.clock.mainthread()', which schedules the call to occur in next available frame on the main
-        thread. If we didn't use the '@mainthread' decorator, we'd need to remember to use
-        'kivy.clock.mainthread(_update_data())' anywhere we call this method."""
-
-        self._counter_label.text = "%s" % counter_value
+        '''Send a MultiplyCommand to the workers. This will tell each worker to multiply its counter increment by 10.
+        If the worker thread's queue is full because someone is hammering the button, the queue's overflow policy
+        decides what happens (by default, the press is merged into the last queued one, so nothing is lost and the
+        queue doesn't grow).'''
+        self._send_command(MultiplyCommand(10))
+
+    def _publish_counter(self, counter_value):
+        """This helper method runs on the worker thread (or the process pool's collector thread). It turns the counter
+        into display text and publishes the text to '_counter_channel'. Converting a really big number to text takes a
+        while, so we do it here rather than in '_update_data()' on the main thread."""
+        self._counter_channel.publish(self._counter_formatter.format(counter_value))
+
+    def _update_data(self, counter_text):
+        """This helper method updates the counter label text. Kivy (and most UI frameworks) are not inherently
+        thread-safe and require that updates to UI elements happen in the main thread. We never call this method
+        directly from the worker thread. Instead, the worker publishes text to '_counter_channel', which calls this
+        method on the main thread. Kivy's '@mainthread' decorator would also get us onto the main thread, but it
+        schedules one call per value, whereas the channel coalesces values so that we only ever apply the newest one.
+
+        In fast-start mode, the counter label isn't created until after the first frame, so we also hold onto the
+        text for '_create_counter_label()' to start from."""
+        self._counter_text = counter_text
+        if self._counter_label is not None:
+            self._counter_label.text = counter_text
+
+            '''Render the new text now, so that the frame scheduler's budget covers it (see frame_scheduler.py).'''
+            frame_scheduler.render_now(self._counter_label)
 
     def _worker(self):
         """This is the method that will be invoked inside a new thread. It's safe to make blocking calls or do
         long-running computations inside this method because it will share time with the main UI thread instead of
-        blocking it--so the UI will remain responsive."""
-
-        '''Set up a counter variable and a counter increment variable. The counter increment variable tracks how much
-        to add to the counter in each pass through the loop.'''
-        counter = 0
-        counter_increment = 1
-
-        '''Loop forever. If we receive a 'die' message, we'll break out of this loop with a 'return' statement.'''
-        while True:
-
-            '''Sleep for 1 second. This is a blocking call that would normally freeze the UI if it were called on the
-            main thread. If you're polling a GPIO or doing something fast periodically, you could just use Kivy's timers
-            and avoid the complexity of threads . However, if you need to do something like issue a device read that
-            will take some time to return, threads are a useful way to avoid freezing the UI. Note that you always want
-            to make calls that time out and return after some reasonably short amount of time so that you can move on
-            and service the message queue in a timely manner (1s max timeout is probably a decent guideline as users can
-            probably tolerate a 1s delay in waiting for the thread to process a 'die' command and terminate, but 
-            timeout values really depend upon your application).'''
-            time.sleep(1)
-
-            '''Increment the counter'''
-            counter += counter_increment
-
-            '''Update the counter label. Note that although it looks like we're calling this immediately from the worker
-            thread, the '@mainthread' decorator on '_update_data()' actually schedules this to be run on the main thread
-            at the next opportunity. This ensures that '_update_data()' safely accesses any UI elements from the main
-            thread and not unsafely from the worker thread.'''
-            self._update_data(counter)
-
-            '''Now check the length of message queue to see if the UI thread sent us any messages. We'll loop and
-            process any messages until the queue is empty.'''
-            while len(self._thread_queue) > 0:
-                '''Pop a tuple from the message queue. The 'command, data =' syntax automatically destructures the tuple
-                into separate variables. Note that we're not currently using the 'data' part of the message. That's just
-                to demonstrate one way of passing data in addition to a command string.'''
-                command, data = self._thread_queue.pop()
-
-                '''Process the message. Note that the commands are arbitrary strings we've chosen.'''
-                if command == 'die':
-                    '''If the UI sent us the 'die' command, return. Returning from the worker thread method terminates
-                    the thread.'''
-                    return
-                elif command == '10x':
-                    '''If the UI sent us the '10x' command, multiply the counter increment by 10. This will cause the
-                    counter to count in larger increments. Not that there's any point to this--it's just an
-                    easy-to-observe effect for this demo.'''
-                    counter_increment *= 10
-
-            '''As a final note, we could have created a second message queue to pass messages back to the main (UI)
-            thread from the worker thread. On the main thread, we could have set up a timer to poll that message queue 
-            and process messages from the worker thread on the main thread. That approach is just as valid as using the
-            '@mainthread' decorator to create a method that's dispatched on the main thread. However, by using the
-            '@mainthread' mechanism we can avoid additional polling on the main thread by directly scheduling method
-            calls as needed.'''
+        blocking it--so the UI will remain responsive. The actual counting loop lives in 'count_worker()' in
+        counter_worker.py so that the worker processes can share it. Here, we hand it our message queue and tell it to
+        format each new counter value and publish it to the channel. The channel schedules '_update_data()' to run on
+        the main thread at the next opportunity, which ensures that it safely accesses UI elements from the main thread
+        and not unsafely from the worker thread."""
+        count_worker(self._thread_queue, self._publish_counter)
 
 
 if __name__ == "__main__":
-    '''Construct and run an instance of the DemoApp class.'''
-    DemoApp().run()
+    '''Construct and run an instance of the DemoApp class. Set the DEMO_WORKER_PROCESSES environment variable to a
+    number greater than zero to count with that many worker processes instead of a single worker thread, or set the
+    DEMO_SHARED_MEMORY environment variable to 1 to count in a single worker process that shares memory with the app,
+    or set the DEMO_ASYNC_WORKERS environment variable to a number greater than zero to count with that many asyncio
+    workers. Set the DEMO_DIGIT_COUNTER environment variable to 1 to display the counter with a DigitCounter widget. Set
+    the DEMO_COUNTER_DISPLAY environment variable to 'scientific' or 'last_digits' to shorten long counters. Set the
+    DEMO_COMMAND_OVERFLOW environment variable to 'block' or 'drop_oldest' to change what the worker thread's command
+    queue does when it's full. Set the DEMO_RECORD_SESSION environment variable to a file name to record the session
+    for 'benchmarks.replay'. Set the DEMO_FAST_START environment variable to 1 to create the counter row after the first
+    frame (see startup.py).'''
+    startup.mark('imports')
+    app_kwargs = {'worker_processes': int(os.environ.get('DEMO_WORKER_PROCESSES', '0')),
+                  'shared_memory_worker': os.environ.get('DEMO_SHARED_MEMORY', '0') == '1',
+                  'async_workers': int(os.environ.get('DEMO_ASYNC_WORKERS', '0')),
+                  'digit_counter': os.environ.get('DEMO_DIGIT_COUNTER', '0') == '1',
+                  'counter_display': os.environ.get('DEMO_COUNTER_DISPLAY', CounterFormatter.FULL),
+                  'command_overflow': os.environ.get('DEMO_COMMAND_OVERFLOW', command_queue.MERGE)}
+    demo_app = DemoApp(**app_kwargs)
+    startup.track(demo_app)
+    session_log.record_from_environment(demo_app, 'demo_3', app_kwargs)
+
+    '''asyncio workers need an asyncio event loop, so in that mode we start one with 'asyncio.run()' and let Kivy run
+    its main loop as a coroutine on it. Otherwise, 'run()' runs Kivy's usual main loop.'''
+    if demo_app._async_workers > 0:
+        asyncio.run(demo_app.async_run(async_lib='asyncio'))
+    else:
+        demo_app.run()
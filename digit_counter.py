@@ -0,0 +1,129 @@
+from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Color, Rectangle
+from kivy.properties import ListProperty, NumericProperty, StringProperty
+from kivy.uix.widget import Widget
+
+
+'''Every DigitCounter shares this cache of rendered characters. It maps a '(font_name, font_size, character)' tuple to
+the texture holding that character. A Label re-renders its entire text into a new texture every time the text
+changes. Once a character is in this cache, a DigitCounter never needs to render it again.'''
+_glyph_textures = {}
+
+
+def glyph_texture(font_name, font_size, character):
+    """Returns a texture containing 'character' rendered in the given font, rendering it only the first time it's
+    asked for."""
+    key = (font_name, font_size, character)
+    texture = _glyph_textures.get(key)
+    if texture is None:
+        '''Kivy's core Label class is the text renderer that the Label widget uses under the hood. We use it directly
+        here because all we want is the texture, not a widget.'''
+        core_label = CoreLabel(text=character, font_name=font_name, font_size=font_size)
+        core_label.refresh()
+        texture = core_label.texture
+        _glyph_textures[key] = texture
+    return texture
+
+
+def warm_glyphs(font_name, font_size, characters="0123456789"):
+    """Renders 'characters' into the cache ahead of time so the first update that needs them doesn't have to."""
+    for character in characters:
+        glyph_texture(font_name, font_size, character)
+
+
+class DigitCounter(Widget):
+    """A drop-in replacement for a Label that displays a rapidly changing number.
+
+    Rather than rendering its whole text as one texture, a DigitCounter draws one rectangle per character and paints
+    each rectangle with that character's cached texture. Updating the text just points the rectangles whose characters
+    changed at different textures, so it costs a few graphics instructions per changed character instead of a trip
+    through the text renderer. The trade-off is that characters are simply placed side by side, without the kerning a
+    full text renderer would do, which is fine for digits. Like a Label, the text is centered in the widget."""
+
+    text = StringProperty('')
+    font_name = StringProperty('Roboto')
+    font_size = NumericProperty(15)
+    color = ListProperty([1, 1, 1, 1])
+
+    def __init__(self, **kwargs):
+        super(DigitCounter, self).__init__(**kwargs)
+        self._rectangles = []  # This will hold one Rectangle per character slot we've drawn so far
+        self._drawn_text = None  # This will hold the text the rectangles currently show
+        self._is_layout_dirty = True  # This will track whether the rectangles need to be repositioned
+
+        with self.canvas:
+            self._color_instruction = Color(*self.color)
+
+        '''Changing the text, size, or position several times within one frame only needs one redraw, so we use a
+        Clock trigger. No matter how many times a trigger is called, it runs its callback once, in the next frame.'''
+        self._trigger_refresh = Clock.create_trigger(self._refresh, -1)
+        self.bind(text=self._trigger_refresh, font_name=self._on_layout_change, font_size=self._on_layout_change,
+                  pos=self._on_layout_change, size=self._on_layout_change, color=self._on_color)
+        self._trigger_refresh()
+
+    def texture_update(self, *args):
+        """Brings the rectangles up to date right away instead of in the next frame, like a Label's method of the same
+        name."""
+        self._trigger_refresh.cancel()
+        self._refresh()
+
+    def _on_layout_change(self, *args):
+        self._is_layout_dirty = True
+        self._trigger_refresh()
+
+    def _on_color(self, instance, value):
+        self._color_instruction.rgba = value
+
+    def _refresh(self, *args):
+        """Brings the rectangles up to date with the current text."""
+        text = self.text
+        if text == self._drawn_text and not self._is_layout_dirty:
+            return
+
+        '''A counter usually only changes its last digit or two from one update to the next. If the text is the same
+        length as before and nothing else has moved, we only need to repaint the rectangles whose character changed.
+        We can only get away with that if the new character is exactly as wide as the old one, though; otherwise,
+        everything after it would need to slide over, so we fall back to laying out the whole text.'''
+        if not self._is_layout_dirty and self._drawn_text is not None and len(text) == len(self._drawn_text):
+            for index, (new_character, old_character) in enumerate(zip(text, self._drawn_text)):
+                if new_character != old_character:
+                    texture = glyph_texture(self.font_name, self.font_size, new_character)
+                    rectangle = self._rectangles[index]
+                    if texture.width != rectangle.texture.width:
+                        break
+                    rectangle.texture = texture
+            else:
+                self._drawn_text = text
+                return
+
+        self._layout(text)
+
+    def _layout(self, text):
+        """Points the rectangles at the textures for 'text' and lines them up in the middle of the widget."""
+        textures = [glyph_texture(self.font_name, self.font_size, character) for character in text]
+
+        '''Add more rectangles if this text is longer than any we've drawn before. We keep the extras around when the
+        text gets shorter, just shrunk to nothing, so they're ready for when it grows again.'''
+        while len(self._rectangles) < len(textures):
+            rectangle = Rectangle(size=(0, 0))
+            self.canvas.add(rectangle)
+            self._rectangles.append(rectangle)
+
+        text_width = sum(texture.width for texture in textures)
+        text_height = max([texture.height for texture in textures] or [0])
+        x = self.center_x - text_width / 2.0
+        y = self.center_y - text_height / 2.0
+
+        for index, rectangle in enumerate(self._rectangles):
+            if index < len(textures):
+                texture = textures[index]
+                rectangle.texture = texture
+                rectangle.pos = (int(x), int(y))
+                rectangle.size = texture.size
+                x += texture.width
+            else:
+                rectangle.size = (0, 0)
+
+        self._drawn_text = text
+        self._is_layout_dirty = False
@@ -0,0 +1,148 @@
+"""A main-thread scheduler that limits how much UI work runs in each frame.
+
+At 60 frames per second, Kivy has about 16 milliseconds to run every Clock callback, lay out the widgets, and draw. If a
+burst of updates all land in the same frame (a worker publishing, a timer firing, and a button press, say), they all
+run in that frame and it's late. Instead of scheduling UI changes on the Clock directly, the demos submit them to a
+FrameScheduler with a priority. Each frame, the scheduler runs the most urgent changes first and stops once it has used
+up its time budget, leaving the rest for the next frame. It always runs at least one change per frame so that nothing
+waits forever, which means a single change that takes longer than the whole budget still runs; frames where that
+happens, or where the last change pushed past the budget, are counted as overruns. The scheduler can't split up a
+change once it's running, so work that's bigger than the budget should be submitted in pieces: demo_2's stress-test
+grid submits one change per row, at LOW priority, and the scheduler spreads the rows across as many frames as it takes.
+
+The scheduler can only time the work that happens inside a change. Most of what a UI change costs doesn't happen when a
+property is set, though: a Label renders its new text, and a BatchedUpdates applies its changes, in Clock triggers that
+run later in the frame, where the scheduler can't see them. So the demos' changes do that work themselves before they
+return, with 'render_now()' for text and 'BatchedUpdates.apply()' for batches, and the budget and the overrun count
+cover it. Laying out and drawing the widgets still happen after the scheduler is done with the frame, and aren't
+counted.
+
+Set the DEMO_FRAME_BUDGET_MS environment variable to change the budget of the schedulers the demos create.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+
+import callback_profiler
+from kivy.clock import Clock
+
+'''Priorities. Lower numbers run first.'''
+NORMAL = 0
+LOW = 1
+
+'''By default, spend at most half of a 60 frames-per-second frame on UI changes, leaving the rest for layout and
+drawing.'''
+DEFAULT_BUDGET = float(os.environ.get('DEMO_FRAME_BUDGET_MS', '8')) / 1000
+
+
+class FrameScheduler(object):
+    """Runs submitted UI changes on the main thread, most urgent first, within a per-frame time budget."""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        """'budget' is the most time, in seconds, to spend running changes in one frame."""
+        self._budget = budget
+
+        '''Pending changes live in a heap, which always keeps the smallest entry at the front. Each entry starts with
+        the change's priority and a sequence number, so the heap hands out the most urgent change first and, among
+        changes of the same priority, the one that was submitted first.'''
+        self._tasks = []
+        self._sequence = itertools.count()
+
+        '''Changes can be submitted from any thread (demo_3's channel submits from its worker thread), so a lock guards
+        the heap.'''
+        self._lock = threading.Lock()
+
+        '''A Clock trigger runs its callback once, however many times it's called before then. Submitting a change
+        fires the first trigger, which runs just before the next frame is drawn (a timeout of -1), so a change
+        submitted from a Clock callback can still make it into this frame. Changes that don't fit in the budget fire
+        the second trigger instead, which waits for the following frame (a timeout of zero).'''
+        self._trigger_run = Clock.create_trigger(self._run, -1)
+        self._trigger_deferred_run = Clock.create_trigger(self._run, 0)
+
+        '''Both triggers can run in the same frame, so we keep track of how much of the current frame's budget is
+        already spent.'''
+        self._frame = None  # This will hold the Clock's number for the frame we last ran changes in
+        self._frame_spent = 0.0  # This will hold the time spent running changes in that frame
+        self._frame_run_count = 0  # This will hold the number of changes run in that frame
+        self._is_frame_overrun = False  # This will track whether that frame has already been counted as an overrun
+
+        self.submitted_count = 0  # This counts the changes handed to submit()
+        self.run_count = 0  # This counts the changes that have run
+        self.frame_count = 0  # This counts the frames in which we ran changes
+        self.deferred_count = 0  # This counts the times changes were left for a later frame
+        self.overrun_frame_count = 0  # This counts the frames in which we went over budget
+        self.max_wait = 0.0  # This tracks the longest a change waited between being submitted and running
+
+    @property
+    def pending_count(self):
+        """The number of changes waiting to run."""
+        with self._lock:
+            return len(self._tasks)
+
+    def submit(self, callback, *args, priority=NORMAL):
+        """Asks for 'callback(*args)' to run on the main thread in an upcoming frame. Safe to call from any thread."""
+        with self._lock:
+            heapq.heappush(self._tasks, (priority, next(self._sequence), time.perf_counter(), callback, args))
+            self.submitted_count += 1
+        self._trigger_run()
+
+    def _run(self, delta_time):
+        if Clock.frames != self._frame:
+            self._frame = Clock.frames
+            self._frame_spent = 0.0
+            self._frame_run_count = 0
+            self._is_frame_overrun = False
+
+        start = time.perf_counter()
+        ran = 0
+        while True:
+            with self._lock:
+                if not self._tasks:
+                    break
+
+                '''Stop once the budget is spent, but always run at least one change in a frame.'''
+                is_over_budget = self._frame_spent + time.perf_counter() - start >= self._budget
+                if is_over_budget and self._frame_run_count + ran > 0:
+                    break
+                _, _, submitted, callback, args = heapq.heappop(self._tasks)
+            self.max_wait = max(self.max_wait, start - submitted)
+
+            '''Run the change outside of the lock, so that other threads can keep submitting while it runs. If profiling
+            is turned on, each change is profiled as the callback it really is, and how long it waited since it was
+            submitted is recorded as its lag.'''
+            callback_profiler.profiled(callback, due=submitted)(*args)
+            ran += 1
+
+        self._frame_spent += time.perf_counter() - start
+        self.run_count += ran
+        if ran > 0 and self._frame_run_count == 0:
+            self.frame_count += 1
+        self._frame_run_count += ran
+        if self._frame_spent > self._budget and not self._is_frame_overrun:
+            self._is_frame_overrun = True
+            self.overrun_frame_count += 1
+
+        with self._lock:
+            if self._tasks:
+                self.deferred_count += 1
+                self._trigger_deferred_run()
+
+    def stats(self):
+        """Returns the counters above as a one-line summary, for logging."""
+        return "submitted=%d run=%d pending=%d frames=%d deferred=%d overrun_frames=%d max_wait=%.1fms" % (
+            self.submitted_count, self.run_count, self.pending_count, self.frame_count, self.deferred_count,
+            self.overrun_frame_count, self.max_wait * 1000)
+
+
+def render_now(widget):
+    """Renders a Label's (or a DigitCounter's) text right away, rather than in the Clock trigger that changing the text
+    fired. Call this from a change that sets a label's text, so that rendering it counts against the frame budget."""
+    widget.texture_update()
+
+    '''A Label's 'texture_update()' doesn't cancel the trigger that changing its text fired, so we do, or the text
+    would be rendered all over again later in the frame.'''
+    trigger = getattr(widget, '_trigger_texture', None)
+    if trigger is not None:
+        trigger.cancel()
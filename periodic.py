@@ -0,0 +1,133 @@
+"""Periodic ticks that don't drift.
+
+'Clock.schedule_interval(callback, 1.0)' schedules each call one second after the previous call *actually ran*, and a
+loop that does some work and then calls 'time.sleep(1)' waits one second after the work *finished*. Either way, every
+late wake-up and every bit of processing time pushes all of the following ticks back a little, and over hours those
+little delays add up. The schedules in this module instead keep every tick on a fixed grid of deadlines (start time +
+1 interval, + 2 intervals, and so on) measured on a monotonic clock, so lateness in one tick never carries over into
+the next.
+
+When ticks are missed entirely (say the machine was busy for a few seconds), a schedule can catch up in one of three
+ways, chosen with its 'catch_up' policy:
+
+    SKIP runs one tick and forgets about the rest.
+    BURST runs every missed tick, back to back.
+    COALESCE runs one tick that's told how many periods it covers.
+
+Callbacks receive the number of periods their tick covers, which is always 1 except under COALESCE.
+
+DeadlineSchedule doesn't need Kivy, and demo_3's worker processes import this module for it, so only the Kivy adapter
+imports Kivy, and only when it's used. That way a worker process doesn't pay for starting Kivy.
+"""
+import math
+import time
+
+SKIP = 'skip'
+BURST = 'burst'
+COALESCE = 'coalesce'
+CATCH_UP_POLICIES = (SKIP, BURST, COALESCE)
+
+
+class DeadlineSchedule(object):
+    """Keeps track of when a periodic tick is due. It doesn't run anything itself, so it works anywhere: the Kivy
+    adapter below uses it with the Clock, and demo_3's worker uses it to decide how long to wait on its message queue.
+
+    'clock' is the function used to read the current time. It must never go backwards; 'time.monotonic()' (the default)
+    and Kivy's 'Clock.time()' both qualify."""
+
+    def __init__(self, interval, catch_up=SKIP, clock=time.monotonic):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError("Unknown catch-up policy '%s' (expected one of: %s)" % (
+                catch_up, ", ".join(CATCH_UP_POLICIES)))
+        self._interval = interval
+        self._catch_up = catch_up
+        self._clock = clock
+        self._next_deadline = clock() + interval
+
+        self.ticks = 0  # This counts the ticks handed out by collect()
+        self.periods = 0  # This counts the periods those ticks covered
+        self.missed_periods = 0  # This counts the periods that SKIP threw away
+
+    def time_until_due(self, now=None):
+        """Returns how many seconds until the next tick is due. This is zero (never negative) if it's already due."""
+        if now is None:
+            now = self._clock()
+        return max(0.0, self._next_deadline - now)
+
+    def collect(self, now=None):
+        """Returns a list with one entry per tick that should run now, each the number of periods that tick covers. The
+        list is empty if nothing is due yet. The schedule then moves on to the first deadline that's still in the
+        future."""
+        if now is None:
+            now = self._clock()
+
+        '''An interval of zero (or less) means "as often as possible": every call gets exactly one tick.'''
+        if self._interval <= 0:
+            self.ticks += 1
+            self.periods += 1
+            return [1]
+
+        if now < self._next_deadline:
+            return []
+
+        '''Work out how many deadlines have passed, then move the next deadline along the grid past 'now'. The deadline
+        only ever advances by whole intervals, so it never picks up any of the lateness.'''
+        due_periods = int(math.floor((now - self._next_deadline) / self._interval)) + 1
+        self._next_deadline += due_periods * self._interval
+
+        if self._catch_up == BURST:
+            ticks = [1] * due_periods
+        elif self._catch_up == COALESCE:
+            ticks = [due_periods]
+        else:
+            ticks = [1]
+            self.missed_periods += due_periods - 1
+
+        self.ticks += len(ticks)
+        self.periods += sum(ticks)
+        return ticks
+
+
+class PeriodicClockEvent(object):
+    """Calls a function on Kivy's main thread once per interval, following a DeadlineSchedule. Create one with
+    'schedule_periodic()'."""
+
+    def __init__(self, callback, interval, catch_up):
+        import callback_profiler
+        from kivy.clock import Clock
+
+        self._callback = callback
+        self._name = getattr(callback, '__qualname__', None)
+
+        '''Use the Clock's own idea of the current time so that we agree with it about when a callback is due (and so
+        that anything that takes over the Clock's time, like the headless benchmark, takes us along with it).'''
+        self.schedule = DeadlineSchedule(interval, catch_up, lambda: Clock.time())
+        self._schedule_once = callback_profiler.schedule_once
+        self._event = None
+        self._arm()
+
+    def _arm(self):
+        self._event = self._schedule_once(self._fire, self.schedule.time_until_due(), name=self._name)
+
+    def _fire(self, delta_time):
+        '''The Clock can run a callback a hair early, in which case 'collect()' finds nothing due and we just wait a bit
+        longer.'''
+        for periods in self.schedule.collect():
+            self._callback(periods)
+        self._arm()
+
+    def cancel(self):
+        """Stops the callback from being called again."""
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+
+def schedule_periodic(callback, interval, catch_up=SKIP):
+    """Like 'Clock.schedule_interval()', except that the ticks stay on a fixed grid of deadlines instead of drifting,
+    missed ticks are handled according to 'catch_up', and 'callback' receives the number of periods each tick covers
+    instead of the time since the last call. Returns a PeriodicClockEvent; call its 'cancel()' method to stop it.
+
+    Kivy's Clock only keeps a weak reference to the callbacks it's given, and the callback it's given here belongs to
+    the PeriodicClockEvent, so hold onto the returned object for as long as you want the ticks to continue."""
+    return PeriodicClockEvent(callback, interval, catch_up)
@@ -0,0 +1,117 @@
+"""Runs demo_3's counting loop in a pool of worker processes instead of threads.
+
+The worker processes are started with the 'spawn' method, so each one starts a fresh interpreter and imports this
+module to find the function it's meant to run. That's why the pool and its worker functions live here rather than in
+demo_3.py: a worker only has to import this module and counter_worker.py, not the whole app.
+"""
+import concurrent.futures
+import threading
+
+from command_queue import QueueBatchReader, StopCommand
+from counter_worker import count_worker
+
+
+'''These hold the queues a worker process uses to talk to the app. Each worker process gets its own copy of these
+module-level variables, which '_init_process_worker()' fills in when the process starts.'''
+_process_command_queues = None
+_process_result_queue = None
+
+
+def _init_process_worker(command_queues, result_queue):
+    """Runs once in each new worker process. Multiprocessing queues can only be handed to a process when it starts, not
+    passed along with each task, so the pool passes them to this initializer and we stash them for
+    '_process_worker()'."""
+    global _process_command_queues, _process_result_queue
+    _process_command_queues = command_queues
+    _process_result_queue = result_queue
+
+
+def _process_worker(worker_index, tick_interval, work_per_tick):
+    """Runs 'count_worker()' inside a worker process, tagging each counter value with this worker's index so the app can
+    tell the partial counts apart."""
+
+    def publish(counter):
+        _process_result_queue.put((worker_index, counter))
+
+    count_worker(QueueBatchReader(_process_command_queues[worker_index]), publish, tick_interval, work_per_tick)
+
+
+class ProcessWorkerPool(object):
+    """Runs several copies of 'count_worker()' in a pool of worker processes and combines their partial counts.
+
+    Threads in Python share a single Global Interpreter Lock (GIL), so CPU-bound work in a worker thread competes with
+    the Kivy main loop and with every other worker thread. Worker processes each get their own interpreter (and their
+    own GIL), so CPU-bound work can spread across all of the cores. The price is that everything sent to or from a
+    process has to be pickled and passed through a pipe, so it's only worth it when each worker does real work."""
+
+    def __init__(self, worker_count, publish, tick_interval=1.0, work_per_tick=0):
+        """'publish' is called (from a background thread) with the sum of all workers' counters whenever any of them
+        changes."""
+        self._worker_count = worker_count
+        self._publish = publish
+        self._tick_interval = tick_interval
+        self._work_per_tick = work_per_tick
+
+        self._executor = None  # This will hold the process pool
+        self._futures = None  # This will hold one future per worker task
+        self._command_queues = None  # This will hold one message queue per worker
+        self._result_queue = None  # This will hold the queue all workers send their counters back on
+        self._collector_thread = None  # This will hold the thread that combines the workers' counters
+
+    def start(self):
+        """Starts the worker processes."""
+
+        '''Use the 'spawn' start method, which launches a fresh Python interpreter for each worker. The default on
+        Linux ('fork') copies the whole app process, including the window and any running threads, which can
+        misbehave. We import multiprocessing here, rather than at the top, so that the app only pays for importing it
+        in the modes that use it (see startup.py).'''
+        import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        self._command_queues = [context.Queue() for _ in range(self._worker_count)]
+        self._result_queue = context.Queue()
+
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self._worker_count,
+            mp_context=context,
+            initializer=_init_process_worker,
+            initargs=(self._command_queues, self._result_queue))
+
+        '''Each worker task runs until it's told to die, so submitting one task per process keeps every process in the
+        pool busy with exactly one worker.'''
+        self._futures = [
+            self._executor.submit(_process_worker, worker_index, self._tick_interval, self._work_per_tick)
+            for worker_index in range(self._worker_count)]
+
+        '''Start a thread that waits for counters from the workers. We don't want to block the main thread on this.'''
+        self._collector_thread = threading.Thread(target=self._collect, args=())
+        self._collector_thread.start()
+
+    def broadcast(self, command):
+        """Sends a Command to every worker."""
+        for process_queue in self._command_queues:
+            process_queue.put(command)
+
+    def stop(self):
+        """Tells every worker to die and waits for the processes and the collector thread to finish."""
+        self.broadcast(StopCommand())
+        self._executor.shutdown(wait=True)
+
+        '''The workers have all exited, so nothing else will be added to the result queue. Send the collector a 'None'
+        to tell it to exit once it has processed everything ahead of it.'''
+        self._result_queue.put(None)
+        self._collector_thread.join()
+
+        '''Calling result() re-raises any exception a worker died with so that it doesn't disappear silently.'''
+        for future in self._futures:
+            future.result()
+
+    def _collect(self):
+        """Runs on the collector thread, keeping the latest counter from each worker and publishing their sum."""
+        partial_counts = [0] * self._worker_count
+        while True:
+            result = self._result_queue.get()
+            if result is None:
+                return
+            worker_index, counter = result
+            partial_counts[worker_index] = counter
+            self._publish(sum(partial_counts))
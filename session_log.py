@@ -0,0 +1,213 @@
+"""Records a session of one of the demos to a compact binary log, so that it can be replayed later without a screen.
+
+Set the DEMO_RECORD_SESSION environment variable to a file name when running any of the demos to record the session to
+that file. 'python -m benchmarks.replay <file>' replays it (see there for what a replay reports).
+
+A recording holds everything that drives the app: every Clock tick, every button press, and every value a worker
+publishes to demo_3's counter channel. Worker threads and processes run whenever the operating system gets around to
+them, so their timing is different on every run; recording the values they publish instead lets a replay feed the app
+exactly the same values at exactly the same points without starting any workers at all. When the app stops, the
+recording ends with a snapshot of every widget's text, opacity, and disabled flag, which the replay checks its own
+final state against.
+
+The file starts with a header: the magic bytes, a format version, and a JSON description of the recording (which demo,
+how its DemoApp was constructed, and where the Clock's last tick was when recording started). After that comes one
+record per event, in the order the events happened, each starting with a one-byte type:
+
+    FRAME    a Clock tick: the microseconds since the previous tick, as a 4-byte unsigned integer (5 bytes in all)
+    PRESS    a button press: the button's position among the app's buttons, as a 2-byte unsigned integer
+    MESSAGE  a value published to the counter channel: its length, then the value as UTF-8 text
+    STATE    the final widget state: its length, then the state as JSON
+
+A press or a message that appears between two FRAME records happened between those two ticks. At 60 frames per second,
+the ticks cost 300 bytes per second of recording.
+"""
+import functools
+import json
+import os
+import struct
+import threading
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+MAGIC = b'KDSL'
+VERSION = 1
+
+'''Record types.'''
+FRAME = 1
+PRESS = 2
+MESSAGE = 3
+STATE = 4
+
+'''Record layouts. Every record starts with its type, so we read that first and then the rest.'''
+_HEADER_FORMAT = struct.Struct('<4sBI')  # Magic, version, length of the JSON description
+_TYPE_FORMAT = struct.Struct('<B')
+_FRAME_FORMAT = struct.Struct('<I')  # Microseconds since the previous tick
+_PRESS_FORMAT = struct.Struct('<H')  # Button index
+_LENGTH_FORMAT = struct.Struct('<I')  # Length of the text that follows
+
+'''Each tick is stored in whole microseconds relative to the start of the recording, so its time can be rebuilt exactly
+and the rounding never adds up over a long recording.'''
+_MICROSECONDS = 1000000
+
+
+def widget_state(root):
+    """Returns the state a recording checks at the end: for each widget in the tree under 'root', in order, its class
+    name, its text (or 'None' if it has none), its opacity, and whether it's disabled."""
+    return [[type(widget).__name__, getattr(widget, 'text', None), widget.opacity, widget.disabled]
+            for widget in root.walk(restrict=True)]
+
+
+def find_buttons(root):
+    """Returns the buttons in the tree under 'root', in the order a recording numbers them."""
+
+    '''Import the Button widget here rather than at the top, so that demos without buttons don't pay for importing
+    it just because they import this module.'''
+    from kivy.uix.button import Button
+    return [widget for widget in root.walk(restrict=True) if isinstance(widget, Button)]
+
+
+class SessionRecorder(object):
+    """Records a DemoApp's session to a file, from when the app starts until it stops."""
+
+    def __init__(self, app, path, demo_name, app_kwargs=None):
+        """'demo_name' and 'app_kwargs' tell the replay which demo to load and how to construct its DemoApp, so they
+        should match how 'app' was created. 'app_kwargs' must be representable as JSON."""
+        self._app = app
+        self._path = path
+        self._description = {'demo': demo_name, 'app_kwargs': app_kwargs or {}}
+
+        '''Worker threads publish messages while the main thread records ticks, so a lock keeps their records from
+        being interleaved.'''
+        self._lock = threading.Lock()
+        self._file = None  # This will hold the recording file while we're recording
+        self._start_time = 0.0  # This will hold the Clock's time when we started recording
+        self._last_tick_microseconds = 0  # This will hold the time of the last tick we recorded
+        self._frame_event = None  # This will hold the Clock event that records each tick
+
+        self.frame_count = 0  # This counts the ticks recorded
+        self.press_count = 0  # This counts the button presses recorded
+        self.message_count = 0  # This counts the worker messages recorded
+
+        '''Handlers bound to an event run before the app's own 'on_start()' and 'on_stop()' methods, so we start
+        recording before the app schedules anything and take the final snapshot before the app starts shutting down.
+        fbind() holds onto our methods, which keeps this recorder alive for as long as the app is.'''
+        app.fbind('on_start', self._on_start)
+        app.fbind('on_stop', self._on_stop)
+
+    def _on_start(self, app):
+        self._file = open(self._path, 'wb')
+
+        '''The app's timers are timed from when it starts, so the replay has to start its simulated clock from the
+        same point. Kivy also remembers when its last tick happened (which was before the app was built, so a while
+        ago); timeouts the app schedules in 'on_start()' are measured from that tick, so we note how long ago it
+        was.'''
+        self._start_time = Clock.time()
+        self._description['last_tick_offset'] = Clock.get_time() - self._start_time
+        description = json.dumps(self._description).encode('utf-8')
+        self._file.write(_HEADER_FORMAT.pack(MAGIC, VERSION, len(description)))
+        self._file.write(description)
+
+        for index, button in enumerate(find_buttons(app.root)):
+            button.fbind('on_press', self._record_press, index)
+
+        '''demo_3's workers publish through its counter channel, whichever kind of worker is running. Hiding the
+        channel's 'publish()' method with one on the instance lets us see every value on its way through.'''
+        channel = getattr(app, '_counter_channel', None)
+        if channel is not None:
+            channel.publish = self._recording_publish(channel.publish)
+
+        '''An interval of zero calls us on every tick.'''
+        self._frame_event = Clock.schedule_interval(self._record_frame, 0)
+
+    def _recording_publish(self, publish):
+        @functools.wraps(publish)
+        def recording_publish(value):
+            self._write_text(MESSAGE, str(value))
+            self.message_count += 1
+            publish(value)
+
+        return recording_publish
+
+    def _write(self, record_type, payload):
+        with self._lock:
+            if self._file is not None:
+                self._file.write(_TYPE_FORMAT.pack(record_type) + payload)
+
+    def _write_text(self, record_type, text):
+        data = text.encode('utf-8')
+        self._write(record_type, _LENGTH_FORMAT.pack(len(data)) + data)
+
+    def _record_frame(self, delta_time):
+        tick_microseconds = round((Clock.get_time() - self._start_time) * _MICROSECONDS)
+        self._write(FRAME, _FRAME_FORMAT.pack(tick_microseconds - self._last_tick_microseconds))
+        self._last_tick_microseconds = tick_microseconds
+        self.frame_count += 1
+
+    def _record_press(self, index, button):
+        self._write(PRESS, _PRESS_FORMAT.pack(index))
+        self.press_count += 1
+
+    def _on_stop(self, app):
+        '''Kivy can dispatch 'on_stop' more than once, so only the first one ends the recording.'''
+        if self._file is None:
+            return
+        self._frame_event.cancel()
+        self._write_text(STATE, json.dumps(widget_state(app.root)))
+        with self._lock:
+            size = self._file.tell()
+            self._file.close()
+            self._file = None
+        Logger.info("SessionRecorder: recorded %d frames, %d presses, and %d messages (%d bytes) to %s" % (
+            self.frame_count, self.press_count, self.message_count, size, self._path))
+
+
+def record_from_environment(app, demo_name, app_kwargs=None):
+    """Starts recording 'app' to the file named by the DEMO_RECORD_SESSION environment variable, if it's set. Returns
+    the SessionRecorder, or 'None' if we're not recording."""
+    path = os.environ.get('DEMO_RECORD_SESSION')
+    if not path:
+        return None
+    return SessionRecorder(app, path, demo_name, app_kwargs)
+
+
+def read_session(path):
+    """Reads a recording. Returns its description and a list of '(record_type, value)' pairs, where the value is the
+    tick's time in seconds since the recording started for FRAME, the button index for PRESS, the published text for
+    MESSAGE, and the widget state (in the form 'widget_state()' returns) for STATE."""
+    with open(path, 'rb') as session_file:
+        data = session_file.read()
+
+    magic, version, length = _HEADER_FORMAT.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("%s isn't a session recording" % path)
+    if version != VERSION:
+        raise ValueError("%s is a version %d recording (expected version %d)" % (path, version, VERSION))
+    offset = _HEADER_FORMAT.size
+    description = json.loads(data[offset:offset + length].decode('utf-8'))
+    offset += length
+
+    records = []
+    tick_microseconds = 0
+    while offset < len(data):
+        record_type, = _TYPE_FORMAT.unpack_from(data, offset)
+        offset += _TYPE_FORMAT.size
+        if record_type == FRAME:
+            delta_microseconds, = _FRAME_FORMAT.unpack_from(data, offset)
+            offset += _FRAME_FORMAT.size
+            tick_microseconds += delta_microseconds
+            records.append((FRAME, tick_microseconds / _MICROSECONDS))
+        elif record_type == PRESS:
+            index, = _PRESS_FORMAT.unpack_from(data, offset)
+            offset += _PRESS_FORMAT.size
+            records.append((PRESS, index))
+        elif record_type in (MESSAGE, STATE):
+            length, = _LENGTH_FORMAT.unpack_from(data, offset)
+            offset += _LENGTH_FORMAT.size
+            text = data[offset:offset + length].decode('utf-8')
+            offset += length
+            records.append((record_type, json.loads(text) if record_type == STATE else text))
+        else:
+            raise ValueError("%s has an unknown record type %d at byte %d" % (path, record_type, offset - 1))
+    return description, records
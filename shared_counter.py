@@ -0,0 +1,242 @@
+"""Runs demo_3's counting loop in a worker process that talks to the app through a block of shared memory.
+
+SharedCounterBlock lays out the counter and a ring of commands in memory that both processes can see, and
+SharedMemoryWorker starts the worker process and hands the app the block. Like process_worker_pool.py, this lives in
+its own module so that the 'spawn'ed worker process can import it without importing the app.
+"""
+import queue
+import struct
+import time
+
+from command_queue import MultiplyCommand, StopCommand
+from counter_worker import count_worker
+
+
+'''The kinds of worker commands that can travel through shared memory, and the numeric codes that stand in for them
+there.'''
+_COMMAND_CODES = {StopCommand: 1, MultiplyCommand: 2}
+_COMMAND_TYPES = {code: command_type for command_type, code in _COMMAND_CODES.items()}
+
+
+class SharedCounterBlock(object):
+    """A block of shared memory that carries a worker process's counter to the app and the app's commands back to it.
+
+    Sending a value through a multiprocessing Queue means pickling it, pushing it through a pipe, and unpickling it on
+    the other side, once for every value. Here, the worker instead writes its counter straight into memory that both
+    processes can see, and the app simply looks at that memory once per frame. The block is laid out like this:
+
+        offset 0:   sequence number (8 bytes), bumped every time the counter or status changes
+        offset 8:   status word (4 bytes), one of the STATUS_* values below
+        offset 12:  counter length (4 bytes), in bytes
+        offset 16:  command ring head (4 bytes), the number of commands the app has written
+        offset 20:  command ring tail (4 bytes), the number of commands the worker has read
+        offset 24:  counter (COUNTER_CAPACITY bytes), as a little-endian unsigned integer
+        after that: command ring (COMMAND_SLOTS slots), each a command code and its argument (8 bytes each)
+
+    Python can't do atomic memory operations, so a lock guards every access to the block. Each access only copies a
+    few bytes, so the lock is held very briefly. A semaphore acts as a doorbell for the command ring: the app rings it
+    once per command so that the worker can sleep until a command arrives, just like it does on a Queue."""
+
+    STATUS_STARTING = 0  # The worker process hasn't started counting yet
+    STATUS_RUNNING = 1  # The worker process is counting
+    STATUS_OVERFLOWED = 2  # The counter grew too big to fit in COUNTER_CAPACITY bytes
+    STATUS_STOPPED = 3  # The worker process has exited
+
+    COUNTER_CAPACITY = 1024  # Enough room for a counter with about 2,400 decimal digits
+    COMMAND_SLOTS = 64
+
+    _SEQUENCE = struct.Struct('<Q')
+    _STATUS = struct.Struct('<I')
+    _LENGTH = struct.Struct('<I')
+    _INDEX = struct.Struct('<I')
+    _COMMAND = struct.Struct('<qq')
+
+    _SEQUENCE_OFFSET = 0
+    _STATUS_OFFSET = 8
+    _LENGTH_OFFSET = 12
+    _HEAD_OFFSET = 16
+    _TAIL_OFFSET = 20
+    _COUNTER_OFFSET = 24
+    _COMMANDS_OFFSET = _COUNTER_OFFSET + COUNTER_CAPACITY
+    SIZE = _COMMANDS_OFFSET + COMMAND_SLOTS * _COMMAND.size
+
+    def __init__(self, memory, lock, doorbell):
+        """Use 'create()' or 'attach()' rather than calling this directly."""
+        self._memory = memory
+        self._lock = lock
+        self._doorbell = doorbell
+
+    @classmethod
+    def create(cls, context):
+        """Creates a new, zeroed block. 'context' is the multiprocessing context the worker process will be started
+        with, which the lock and semaphore have to match."""
+        from multiprocessing import shared_memory
+        memory = shared_memory.SharedMemory(create=True, size=cls.SIZE)
+        memory.buf[:cls.SIZE] = bytes(cls.SIZE)
+        return cls(memory, context.Lock(), context.Semaphore(0))
+
+    @classmethod
+    def attach(cls, name, lock, doorbell):
+        """Attaches to a block created in another process, using the values that process got from 'handles()'."""
+        from multiprocessing import shared_memory
+        return cls(shared_memory.SharedMemory(name=name), lock, doorbell)
+
+    def handles(self):
+        """Returns the arguments another process needs to pass to 'attach()'."""
+        return self._memory.name, self._lock, self._doorbell
+
+    def close(self):
+        """Detaches this process from the block."""
+        self._memory.close()
+
+    def unlink(self):
+        """Frees the block. Only the process that created it should call this, after every process has closed it."""
+        self._memory.unlink()
+
+    def _read_index(self, offset):
+        return self._INDEX.unpack_from(self._memory.buf, offset)[0]
+
+    def _bump_sequence(self):
+        sequence = self._SEQUENCE.unpack_from(self._memory.buf, self._SEQUENCE_OFFSET)[0]
+        self._SEQUENCE.pack_into(self._memory.buf, self._SEQUENCE_OFFSET, sequence + 1)
+
+    def set_status(self, status):
+        """Sets the status word. Called by the worker."""
+        with self._lock:
+            self._STATUS.pack_into(self._memory.buf, self._STATUS_OFFSET, status)
+            self._bump_sequence()
+
+    def publish(self, counter):
+        """Stores a new counter value. Called by the worker. If the counter doesn't fit, the block's status changes to
+        STATUS_OVERFLOWED and the last value that fit is left in place."""
+        length = max(1, (counter.bit_length() + 7) // 8)
+        with self._lock:
+            if length > self.COUNTER_CAPACITY:
+                self._STATUS.pack_into(self._memory.buf, self._STATUS_OFFSET, self.STATUS_OVERFLOWED)
+            else:
+                start = self._COUNTER_OFFSET
+                self._memory.buf[start:start + length] = counter.to_bytes(length, 'little')
+                self._LENGTH.pack_into(self._memory.buf, self._LENGTH_OFFSET, length)
+            self._bump_sequence()
+
+    def read_if_changed(self, sequence):
+        """Returns a '(sequence, status, counter)' tuple if the block has changed since 'sequence', or 'None' if it
+        hasn't. Called by the app once per frame. Checking the sequence number first means that frames where nothing
+        changed cost one small read and no integer conversion."""
+        with self._lock:
+            current_sequence = self._SEQUENCE.unpack_from(self._memory.buf, self._SEQUENCE_OFFSET)[0]
+            if current_sequence == sequence:
+                return None
+            status = self._STATUS.unpack_from(self._memory.buf, self._STATUS_OFFSET)[0]
+            length = self._LENGTH.unpack_from(self._memory.buf, self._LENGTH_OFFSET)[0]
+            start = self._COUNTER_OFFSET
+            counter = int.from_bytes(self._memory.buf[start:start + length], 'little')
+        return current_sequence, status, counter
+
+    def put(self, command, timeout=None):
+        """Adds a Command to the command ring. Called by the app. This matches Queue's 'put()' so that the app can
+        treat the block like any other message queue. If the ring is full, this waits for the worker to make room,
+        which it does as soon as it wakes up. A worker that has died never will, though, so if the ring is still full
+        after 'timeout' seconds, this gives up and raises 'queue.Full', like Queue does."""
+        code = _COMMAND_CODES[type(command)]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                head = self._read_index(self._HEAD_OFFSET)
+                tail = self._read_index(self._TAIL_OFFSET)
+                if (head - tail) % (1 << 32) < self.COMMAND_SLOTS:
+                    offset = self._COMMANDS_OFFSET + (head % self.COMMAND_SLOTS) * self._COMMAND.size
+                    self._COMMAND.pack_into(self._memory.buf, offset, code, command.argument)
+                    self._INDEX.pack_into(self._memory.buf, self._HEAD_OFFSET, (head + 1) % (1 << 32))
+                    break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise queue.Full
+            time.sleep(0.001)
+
+        '''Ring the doorbell to wake the worker.'''
+        self._doorbell.release()
+
+    def get_batch(self, timeout=None, max_batch=None):
+        """Removes and returns the waiting Commands from the command ring, oldest first. Called by the worker. This
+        matches CommandQueue's 'get_batch()', including raising 'queue.Empty' if no command arrives within 'timeout'
+        seconds, so 'count_worker()' can use the block as its message queue."""
+        if not self._doorbell.acquire(True, timeout):
+            raise queue.Empty
+
+        '''The app rings the doorbell once per command, after writing it, so every ring we can collect without waiting
+        stands for one more command that's already in the ring.'''
+        count = 1
+        while (max_batch is None or count < max_batch) and self._doorbell.acquire(False):
+            count += 1
+
+        with self._lock:
+            tail = self._read_index(self._TAIL_OFFSET)
+            batch = []
+            for index in range(tail, tail + count):
+                offset = self._COMMANDS_OFFSET + (index % self.COMMAND_SLOTS) * self._COMMAND.size
+                code, argument = self._COMMAND.unpack_from(self._memory.buf, offset)
+                batch.append(_COMMAND_TYPES[code].from_argument(argument))
+            self._INDEX.pack_into(self._memory.buf, self._TAIL_OFFSET, (tail + count) % (1 << 32))
+        return batch
+
+
+def _shared_memory_worker(name, lock, doorbell, tick_interval, work_per_tick):
+    """Runs 'count_worker()' inside a worker process, using a SharedCounterBlock as both its message queue and the place
+    it publishes counter values."""
+    block = SharedCounterBlock.attach(name, lock, doorbell)
+    block.set_status(SharedCounterBlock.STATUS_RUNNING)
+    try:
+        count_worker(block, block.publish, tick_interval, work_per_tick)
+    finally:
+        block.set_status(SharedCounterBlock.STATUS_STOPPED)
+        block.close()
+
+
+class SharedMemoryWorker(object):
+    """Runs 'count_worker()' in a single worker process that talks to the app through a SharedCounterBlock."""
+
+    PUT_CHECK_INTERVAL = 0.1  # How often, in seconds, to check that the worker is alive while waiting for room
+
+    def __init__(self, tick_interval=1.0, work_per_tick=0):
+        self._tick_interval = tick_interval
+        self._work_per_tick = work_per_tick
+
+        self._block = None  # This will hold the SharedCounterBlock
+        self._process = None  # This will hold the worker Process object
+
+    def start(self):
+        """Creates the shared memory block and starts the worker process."""
+        import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        self._block = SharedCounterBlock.create(context)
+        self._process = context.Process(
+            target=_shared_memory_worker,
+            args=self._block.handles() + (self._tick_interval, self._work_per_tick))
+        self._process.start()
+
+    def send_command(self, command):
+        """Sends a Command to the worker. If the worker process has died, the command is dropped, since there's no
+        one left to carry it out."""
+
+        '''If the ring is full, wait for the worker to make room, but keep checking that it's still alive, or a worker
+        that died would leave us waiting forever.'''
+        while self._process.is_alive():
+            try:
+                self._block.put(command, timeout=self.PUT_CHECK_INTERVAL)
+                return
+            except queue.Full:
+                pass
+
+    def read_if_changed(self, sequence):
+        """See 'SharedCounterBlock.read_if_changed()'."""
+        return self._block.read_if_changed(sequence)
+
+    def stop(self):
+        """Tells the worker to die, waits for it to exit, and frees the shared memory."""
+
+        '''There's no point telling a worker that has already died to stop, but join it anyway, to clean up after it.'''
+        if self._process.is_alive():
+            self.send_command(StopCommand())
+        self._process.join()
+        self._block.close()
+        self._block.unlink()
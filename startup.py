@@ -0,0 +1,202 @@
+"""Faster cold starts, and a report of where the time before the first frame goes.
+
+The demos import this module before anything else so that it can start timing as early as possible. Once the app has
+drawn its first frame (and, in fast-start mode, the frame after that), the demos log a breakdown of their start-up, one
+line per phase:
+
+    imports              importing the demo and everything it imports, Kivy included
+    constructor          constructing the DemoApp
+    config and kv        App.run() loading the app's settings and kv file
+    window               creating the window (and its OpenGL context)
+    build                the app's build() method
+    attach               attaching the widgets to the window
+    main loop start      the app's on_start() and Kivy starting its main loop
+    first frame          the first frame: Clock callbacks, layout, rendering text, and drawing
+    after first frame    (fast-start mode only) warming up caches and building the deferred widgets
+    second frame         (fast-start mode only) drawing the deferred widgets
+
+Set the DEMO_FAST_START environment variable to 1 to start in fast-start mode. The demos add widgets that aren't needed
+for the first frame (the ones in the bottom row, say) with 'add_after_first_frame()'. Normally that adds them right
+away, but in fast-start mode it adds a bare placeholder widget to hold their place in the layout, and only builds the
+real widget once the first frame is on the screen. Right before that, it runs the callbacks the demos handed to
+'warm_up()', which render the strings the app is going to need (the labels' text and the digits) ahead of time, so
+that the widgets built then and the first counter updates find the font loaded and the characters rasterized.
+
+Modules that only some of a demo's modes use (the Button widget, DigitCounter, BatchedUpdates, multiprocessing) are
+imported where they're first used rather than at the top of the demo, so that they cost nothing until then. Importing
+Kivy's App pulls in most of Kivy, along with asyncio and concurrent.futures, and every demo's first frame needs the
+Label widget (which Button builds on), so there's no point in deferring any of those.
+"""
+import functools
+import os
+import time
+
+'''Note when this module was imported, which, for the demos, is when their own imports began.'''
+_start_time = time.perf_counter()
+
+ENABLED = os.environ.get('DEMO_FAST_START', '0') == '1'
+
+'''This holds each phase that has ended, as a '(name, end time)' pair, in order.'''
+_phases = []
+
+'''This holds the widgets waiting to be built after the first frame, as '(layout, placeholder, factory)' tuples, and
+the caches waiting to be warmed up, as '(callback, args)' tuples.'''
+_deferred_widgets = []
+_deferred_warm_ups = []
+_first_frame_trigger = None  # This will hold the Clock trigger that waits for the first frame
+_is_tracking = False  # This will track whether 'track()' is timing an app
+_is_complete = False  # This will track whether start-up is over
+
+
+def mark(phase):
+    """Notes that 'phase' just ended."""
+    _phases.append((phase, time.perf_counter()))
+
+
+def phases():
+    """Returns the phases that have ended so far as a list of '(name, seconds)' pairs."""
+    durations = []
+    previous = _start_time
+    for phase, end in _phases:
+        durations.append((phase, end - previous))
+        previous = end
+    return durations
+
+
+def is_complete():
+    """Whether the app 'track()' is timing has finished starting up (and its breakdown has been logged)."""
+    return _is_complete
+
+
+def add_after_first_frame(layout, factory, **placeholder_properties):
+    """Adds the widget 'factory()' returns to 'layout'. In fast-start mode, this adds a placeholder Widget with the
+    given properties (give it the real widget's 'size_hint' so the layout doesn't move) instead, and swaps in the
+    widget from 'factory()' after the first frame."""
+    if not ENABLED:
+        layout.add_widget(factory())
+        return
+
+    '''A bare Widget draws nothing and has no text to render, so it costs next to nothing.'''
+    from kivy.uix.widget import Widget
+    placeholder = Widget(**placeholder_properties)
+    layout.add_widget(placeholder)
+    _deferred_widgets.append((layout, placeholder, factory))
+    _trigger_after_first_frame()
+
+
+def warm_up(callback, *args):
+    """In fast-start mode, runs 'callback(*args)' after the first frame. Hand this the functions that fill caches
+    ahead of time, like 'render_text()' or digit_counter's 'warm_glyphs()'. Outside of fast-start mode, the app starts
+    the way it always has, so this does nothing."""
+    if not ENABLED:
+        return
+    _deferred_warm_ups.append((callback, args))
+    _trigger_after_first_frame()
+
+
+def render_text(strings, font_size, font_name='Roboto'):
+    """Renders each of 'strings' in the text renderer once, so that Kivy has the font loaded and the characters
+    rasterized before a widget needs them."""
+
+    '''Kivy's core Label class is the text renderer that the Label widget uses under the hood, as in
+    digit_counter.py.'''
+    from kivy.core.text import Label as CoreLabel
+    for text in strings:
+        CoreLabel(text=text, font_size=font_size, font_name=font_name).refresh()
+
+
+def _trigger_after_first_frame():
+    global _first_frame_trigger
+    if _first_frame_trigger is None:
+        from kivy.clock import Clock
+
+        '''A callback scheduled with a timeout of zero runs in the next frame, before it's drawn. Scheduling another
+        one from there makes it run in the frame after that, which is after the first frame has been drawn.'''
+        _first_frame_trigger = Clock.create_trigger(_run_after_first_frame, 0)
+        Clock.schedule_once(lambda delta_time: _first_frame_trigger(), 0)
+
+
+def _run_after_first_frame(delta_time):
+    '''Warm the caches first, so the widgets we're about to build find them ready.'''
+    while _deferred_warm_ups:
+        callback, args = _deferred_warm_ups.pop(0)
+        callback(*args)
+    has_new_widgets = bool(_deferred_widgets)
+    while _deferred_widgets:
+        layout, placeholder, factory = _deferred_widgets.pop(0)
+
+        '''Put the widget exactly where its placeholder was.'''
+        index = layout.children.index(placeholder)
+        layout.remove_widget(placeholder)
+        layout.add_widget(factory(), index)
+    mark('after first frame')
+
+    '''If there's nothing new to draw, the window might not draw another frame, so we're done.'''
+    if not has_new_widgets:
+        _finish()
+
+
+def _on_flip(window):
+    '''The window flips once it has drawn a frame. Only the first frame and, in fast-start mode, the frame after
+    the deferred widgets were built count.'''
+    last_phase = _phases[-1][0]
+    if last_phase == 'main loop start':
+        mark('first frame')
+        if _first_frame_trigger is None:
+            _finish()
+    elif last_phase == 'after first frame':
+        mark('second frame')
+        _finish()
+
+
+def _finish():
+    global _is_complete
+    if _is_complete:
+        return
+    _is_complete = True
+    if not _is_tracking:
+        return
+
+    from kivy.core.window import Window
+    from kivy.logger import Logger
+    Window.funbind('on_flip', _on_flip)
+    total = 0.0
+    for phase, duration in phases():
+        total += duration
+        Logger.info("Startup: %-18s %8.1f ms  (%8.1f ms total)" % (phase, duration * 1000, total * 1000))
+
+
+def track(app):
+    """Times 'app''s start-up and logs the breakdown once it's done. Call this right after constructing the app, and
+    call 'mark("imports")' right before, so that the time until then is split into 'imports' and 'constructor'."""
+    global _is_tracking
+    from kivy.clock import Clock
+    _is_tracking = True
+    mark('constructor')
+
+    '''App.run() loads the app's settings and kv file, and then calls build(). Hiding build() with a wrapper on the
+    instance lets us see where one ends and the other begins. The window gets created the first time anything
+    imports it, which would otherwise be somewhere in the middle of build(), when the first widget needs it, so we
+    create it first to time it on its own.'''
+    build = app.build
+
+    @functools.wraps(build)
+    def timed_build():
+        mark('config and kv')
+        from kivy.core.window import Window  # noqa: F401
+        mark('window')
+        root = build()
+        mark('build')
+        return root
+
+    app.build = timed_build
+
+    def on_start(app):
+        '''App.run() attaches the widgets to the window right after build(), and starts the main loop right after
+        on_start(). The first Clock callback runs at the beginning of the first frame.'''
+        from kivy.core.window import Window
+        mark('attach')
+        Clock.schedule_once(lambda delta_time: mark('main loop start'), 0)
+        Window.fbind('on_flip', _on_flip)
+
+    app.fbind('on_start', on_start)
@@ -0,0 +1,119 @@
+"""Tests for how quickly demo_3's counting loop stops, and that it keeps counting while commands keep arriving.
+
+Run these from the top of the repository with:
+
+    python -m unittest discover -s tests
+
+Neither 'count_worker()' nor CommandQueue needs a window, so these run anywhere.
+"""
+import threading
+import time
+import unittest
+
+from command_queue import CommandQueue, MultiplyCommand, StopCommand
+from counter_worker import count_worker
+
+'''How long a stop may take, in seconds. The worker wakes up as soon as a command arrives, so anything close to a tick
+interval means it's waiting out a sleep instead.'''
+STOP_LATENCY = 0.05
+
+
+class CountWorkerStopTest(unittest.TestCase):
+
+    def _start(self, publish, tick_interval):
+        command_queue = CommandQueue()
+        thread = threading.Thread(target=count_worker, args=(command_queue, publish, tick_interval), daemon=True)
+        thread.start()
+
+        '''If a test fails before it stops the worker, stop it here, so that it doesn't keep the test run alive.
+        Cleanups run last-registered first, so the StopCommand goes in before the join. (A worker that has already
+        stopped just leaves it in the queue.) The thread is a daemon as well, in case the worker is stuck and never
+        reads it.'''
+        self.addCleanup(thread.join, 1.0)
+        self.addCleanup(command_queue.put, StopCommand())
+        return command_queue, thread
+
+    def _assert_stops_quickly(self, thread, start):
+        thread.join(STOP_LATENCY)
+        self.assertFalse(thread.is_alive(), "the worker didn't stop within %d ms" % (STOP_LATENCY * 1000))
+        self.assertLess(time.perf_counter() - start, STOP_LATENCY)
+
+    def test_stop_while_ticking(self):
+        counters = []
+        command_queue, thread = self._start(counters.append, 0.01)
+
+        '''Let it tick a few times first, so that we stop it while it's busy counting.'''
+        deadline = time.monotonic() + 1.0
+        while len(counters) < 3 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertGreaterEqual(len(counters), 3)
+
+        start = time.perf_counter()
+        command_queue.put(StopCommand())
+        self._assert_stops_quickly(thread, start)
+
+    def test_stop_while_waiting_for_a_long_tick(self):
+        '''The next tick is ten seconds away, so a worker that slept until then couldn't pass.'''
+        command_queue, thread = self._start(lambda counter: None, 10.0)
+        time.sleep(0.01)
+
+        start = time.perf_counter()
+        command_queue.put(StopCommand())
+        self._assert_stops_quickly(thread, start)
+
+    def test_stop_arriving_mid_tick(self):
+        '''Hold the worker inside its first tick's 'publish()', send the StopCommand while it's stuck there, and then
+        let it go. It should notice the command as soon as it finishes the tick, without waiting for another one.'''
+        is_in_tick = threading.Event()
+        may_finish_tick = threading.Event()
+        counters = []
+
+        def publish(counter):
+            counters.append(counter)
+            is_in_tick.set()
+            may_finish_tick.wait(1.0)
+
+        command_queue, thread = self._start(publish, 0.02)
+        self.assertTrue(is_in_tick.wait(1.0))
+        command_queue.put(StopCommand())
+
+        start = time.perf_counter()
+        may_finish_tick.set()
+        self._assert_stops_quickly(thread, start)
+        self.assertEqual(counters, [1])
+
+
+class _ScriptedQueue(object):
+    """Stands in for a CommandQueue: each 'get_batch()' waits for a while and then returns the next batch in the script,
+    whatever the timeout, as if commands were always arriving before the next tick was due."""
+
+    def __init__(self, delay, batches):
+        self._delay = delay
+        self._batches = iter(batches)
+
+    def get_batch(self, timeout=None, max_batch=None):
+        time.sleep(self._delay)
+        return next(self._batches)
+
+
+class CountWorkerCommandStreamTest(unittest.TestCase):
+
+    def test_ticks_keep_running_while_commands_arrive(self):
+        '''Commands arrive every 2 ms for 0.3 seconds, so no wait ever times out, but the 10 ms ticks should still run
+        about 30 times.'''
+        counters = []
+        batches = [[MultiplyCommand(1)]] * 150 + [[StopCommand()]]
+        count_worker(_ScriptedQueue(0.002, batches), counters.append, 0.01)
+        self.assertGreaterEqual(len(counters), 10)
+
+    def test_ticks_due_before_a_command_use_the_old_increment(self):
+        '''Five or so ticks are due by the time the 10x command arrives. They should count by one, not by ten.'''
+        counters = []
+        count_worker(_ScriptedQueue(0.05, [[MultiplyCommand(10)], [StopCommand()]]), counters.append, 0.01)
+        self.assertTrue(counters)
+        self.assertGreaterEqual(counters[0], 4)
+        self.assertLess(counters[0], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Tests that periodic.py's DeadlineSchedule doesn't drift.
+
+Each test drives a schedule with a fake clock through a simulated day of one-second ticks, with every wake-up a few
+milliseconds late and an hourly stall of several seconds, and checks the schedule's counts against the time that
+passed. 'benchmarks.drift' runs a similar simulation and prints a report instead.
+"""
+import math
+import random
+import unittest
+
+import periodic
+
+SECONDS = 24 * 3600.0  # How long each simulated run lasts
+INTERVAL = 1.0
+MAX_WAKE_UP_DELAY = 0.004  # Every wake-up is late by up to this many seconds
+TICK_DURATION = 0.001  # Every tick takes this long to run
+STALL_EVERY = 3600.0  # Once every this many seconds...
+STALL_DURATION = 5.5  # ...the program stalls for this long
+
+
+class FakeClock(object):
+    """A clock that only moves when we move it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class DeadlineScheduleDriftTest(unittest.TestCase):
+
+    def _run_day(self, catch_up, check):
+        """Runs a schedule with the 'catch_up' policy for SECONDS simulated seconds, calling 'check(schedule,
+        elapsed)' after every tick. Returns the schedule."""
+        clock = FakeClock()
+        schedule = periodic.DeadlineSchedule(INTERVAL, catch_up, clock)
+        jitter = random.Random(1)
+        next_stall = STALL_EVERY
+        while clock.now < SECONDS:
+            '''Sleep until the next tick is due, but wake up a little late, and stall now and then.'''
+            clock.now += schedule.time_until_due() + jitter.uniform(0, MAX_WAKE_UP_DELAY)
+            if clock.now >= next_stall:
+                clock.now += STALL_DURATION
+                next_stall += STALL_EVERY
+
+            ticks = schedule.collect()
+            self.assertTrue(ticks)
+            clock.now += TICK_DURATION * len(ticks)
+            check(schedule, clock.now)
+        return schedule
+
+    def _expected_periods(self, elapsed):
+        '''The ticks run just after the deadline they're for, so every whole interval that has passed is due.'''
+        return int(math.floor(elapsed / INTERVAL))
+
+    def test_burst_has_no_drift(self):
+        def check(schedule, elapsed):
+            self.assertEqual(schedule.periods, self._expected_periods(elapsed))
+
+        schedule = self._run_day(periodic.BURST, check)
+        self.assertEqual(schedule.ticks, schedule.periods)
+        self.assertEqual(schedule.missed_periods, 0)
+
+    def test_coalesce_has_no_drift(self):
+        def check(schedule, elapsed):
+            self.assertEqual(schedule.periods, self._expected_periods(elapsed))
+
+        schedule = self._run_day(periodic.COALESCE, check)
+
+        '''Every stall is folded into one tick, so there are fewer ticks than periods.'''
+        self.assertLess(schedule.ticks, schedule.periods)
+        self.assertEqual(schedule.missed_periods, 0)
+
+    def test_skip_loses_exactly_the_missed_periods(self):
+        def check(schedule, elapsed):
+            self.assertEqual(schedule.periods + schedule.missed_periods, self._expected_periods(elapsed))
+
+        schedule = self._run_day(periodic.SKIP, check)
+        self.assertEqual(schedule.ticks, schedule.periods)
+
+        '''Each stall skips at least the whole seconds it lasted.'''
+        self.assertGreaterEqual(schedule.missed_periods, int(SECONDS / STALL_EVERY) * int(STALL_DURATION))
+
+    def test_non_positive_interval_ticks_on_every_call(self):
+        for interval in (0, -1.0):
+            for catch_up in periodic.CATCH_UP_POLICIES:
+                clock = FakeClock()
+                schedule = periodic.DeadlineSchedule(interval, catch_up, clock)
+                for _ in range(5):
+                    self.assertEqual(schedule.time_until_due(), 0.0)
+                    self.assertEqual(schedule.collect(), [1])
+                    self.assertEqual(schedule.collect(), [1])
+                    clock.now += 10.0
+                self.assertEqual((schedule.ticks, schedule.periods, schedule.missed_periods), (10, 10, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()